@@ -1,9 +1,21 @@
-import requests
+import http_client
+import rate_budget
 from dotenv import load_dotenv
 import os
+import glob
+import hashlib
 import json
+import threading
+import time
+import zlib
+from collections import namedtuple
+from contextlib import closing
+from urllib.parse import parse_qsl, urlencode
 import streamlit as st
-from datetime import datetime
+from datetime import datetime, timedelta
+from db import CACHE_DIR, connect
+from single_flight import single_flight
+from upstream_scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, PRIORITY_SPECULATIVE
 
 base_url = "https://ski-resort-conditions.p.rapidapi.com/"
 
@@ -16,71 +28,358 @@ default_headers = {
     'x-rapidapi-key': api_key
 }
 
+# How long a cached payload stays fresh, by endpoint. Anything not listed is a live
+# condition feed and is revalidated once the day rolls over.
+CACHE_MAX_AGE = {
+    "get_resorts_id": timedelta(days=7),
+}
+
+# Past its freshness, a payload is still served (and refreshed in the background) up to this age
+CACHE_MAX_STALE = timedelta(hours=float(os.getenv("CACHE_MAX_STALE_HOURS", "72")))
+
+STALE_CACHE_STATE_KEY = "stale_cache"
+
+RATE_BUDGET_UPSTREAM = "rapidapi"
+# Background callers sleep through a full budget window that resets within this long
+BUDGET_MAX_WAIT_SECONDS = float(os.getenv("BUDGET_MAX_WAIT_SECONDS", "90"))
+
+
+class BudgetDeferredError(Exception):
+    # The local request budget held a call back before it went upstream. Unlike a 429 nothing
+    # was spent and upstream is fine, the call can go out once the budget resets.
+    def __init__(self, resets_at):
+        super().__init__(f"API request budget spent until {datetime.fromtimestamp(resets_at):%H:%M:%S}")
+        self.resets_at = resets_at
+
+
+def wait_for_budget(error, max_wait_seconds=BUDGET_MAX_WAIT_SECONDS):
+    # Sleeps until the budget that deferred a call resets, False when that is too far off
+    delay = error.resets_at - time.time()
+    if delay > max_wait_seconds:
+        return False
+    time.sleep(max(0.0, delay))
+    return True
+
+
+def is_cache_fresh(key, timestamp):
+    max_age = CACHE_MAX_AGE.get(key.split("?")[0])
+    if max_age is None:
+        return timestamp.date() == datetime.now().date()
+    return datetime.now() - timestamp < max_age
+
+
+CACHE_DB = "cache.db"
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS api_cache (
+    key_hash TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Touched after every committed write; its mtime tells each process when its memo is outdated
+CACHE_STAMP_PATH = os.path.join(CACHE_DIR, "cache.db.stamp")
+
+_migration_lock = threading.Lock()
+_migrated = False
+
+# Parsed payloads shared by every session in this process, keyed by canonical cache key
+# derived holds values computed from data by fetch_derived_data, dropped along with the entry
+CacheEntry = namedtuple("CacheEntry", ["signature", "timestamp", "data", "derived"])
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def canonical_cache_key(key):
+    url, _, query = key.partition("?")
+    if not query:
+        return url
+    return url + "?" + urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+
+
+def _hash_cache_key(key):
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _connect_cache():
+    connection = closing(connect(CACHE_DB, CACHE_SCHEMA))
+    _migrate_json_cache_files()
+    return connection
+
+
+def _upsert_cache_entry(connection, key, timestamp, data):
+    # Only ever replace an entry with a newer one, so a slow writer cannot roll the cache back
+    connection.execute(
+        "INSERT INTO api_cache (key_hash, key, timestamp, data) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (key_hash) DO UPDATE SET key = excluded.key, timestamp = excluded.timestamp, "
+        "data = excluded.data WHERE excluded.timestamp >= api_cache.timestamp",
+        (_hash_cache_key(key), key, timestamp, zlib.compress(json.dumps(data).encode("utf-8"))),
+    )
+
+
+def _migrate_json_cache_files():
+    # Import the old one-file-per-key JSON cache. The files stay in place as seed data.
+    global _migrated
+    if _migrated:
+        return
+    with _migration_lock:
+        if _migrated:
+            return
+        with closing(connect(CACHE_DB, CACHE_SCHEMA)) as connection, connection:
+            for cache_path in glob.glob(os.path.join(CACHE_DIR, "*.json")):
+                try:
+                    with open(cache_path, "r") as f:
+                        cached = json.loads(f.read())
+                    key = canonical_cache_key(os.path.basename(cache_path)[:-len(".json")])
+                    _upsert_cache_entry(connection, key, cached["timestamp"], cached["data"])
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Skipping cache file {cache_path}: {e}")
+        _touch_cache_stamp()
+        _migrated = True
+
+
+def _touch_cache_stamp():
+    with open(CACHE_STAMP_PATH, "a"):
+        os.utime(CACHE_STAMP_PATH, None)
+
+
+def _cache_signature():
+    try:
+        return os.stat(CACHE_STAMP_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _read_cache_entry(key):
+    # Taken before reading so a write that lands mid-read invalidates the memo next time
+    signature = _cache_signature()
+    with _memo_lock:
+        entry = _memo.get(key)
+    if entry is not None and entry.signature == signature:
+        return entry
+
+    with _connect_cache() as connection:
+        row = connection.execute(
+            "SELECT timestamp, data FROM api_cache WHERE key_hash = ?", (_hash_cache_key(key),)
+        ).fetchone()
+    if row is None:
+        return None
+
+    timestamp, data = row
+    data = json.loads(zlib.decompress(data))
+    entry = CacheEntry(signature, datetime.fromisoformat(timestamp), data, {})
+    with _memo_lock:
+        _memo[key] = entry
+    return entry
+
 
 def get_from_cache(key):
-    if not os.path.exists("cache"):
-        os.makedirs("cache")
-    
-    cache_path = os.path.join("cache", f"{key}.json")
-    
-    if os.path.exists(cache_path):
-        with open(cache_path, "r") as f:
-            cached = json.loads(f.read())
-            cached_date = datetime.fromisoformat(cached["timestamp"]).date()
-            today = datetime.now().date()
-            
-            if cached_date == today:
-                print(f"Using cached data from today", cache_path)
-                st.session_state.rate_limited = False
-                return cached["data"]
-            else:
-                # Delete stale cache
-                os.remove(cache_path)
-                print(f"Removed stale cache file")
+    key = canonical_cache_key(key)
+    entry = _read_cache_entry(key)
+
+    if entry is not None:
+        if is_cache_fresh(key, entry.timestamp):
+            st.session_state.rate_limited = False
+            return entry.data
+        # Stale entries are left in place and overwritten by the next successful fetch
+        print(f"Cached data is stale", key)
     return None
 
 
 def write_to_cache(key, data):
-    if not os.path.exists("cache"):
-        os.makedirs("cache")
-    
-    cache_path = os.path.join("cache", f"{key}.json")
-    
-    cache_entry = {
-        "timestamp": datetime.now().isoformat(),
-        "data": data
-    }
-    with open(cache_path, "w") as f:
-        f.write(json.dumps(cache_entry, indent=2))
+    key = canonical_cache_key(key)
+    timestamp = datetime.now().isoformat()
+    with _connect_cache() as connection, connection:
+        _upsert_cache_entry(connection, key, timestamp, data)
+    _touch_cache_stamp()
+    for hook in _cache_write_hooks.get(key.split("?")[0], []):
+        try:
+            hook(key, timestamp, data)
+        except Exception as e:
+            print(f"Cache write hook failed for {key}: {e}")
+
+
+# Run as hook(key, timestamp, data) after a payload for the endpoint is committed
+_cache_write_hooks = {}
+
+
+def register_cache_write_hook(endpoint, hook):
+    hooks = _cache_write_hooks.setdefault(endpoint, [])
+    if hook not in hooks:
+        hooks.append(hook)
+
+
+def get_cached_payload_timestamps(endpoint):
+    # Canonical key -> ISO timestamp for every cached payload of the endpoint, without decoding any
+    with _connect_cache() as connection:
+        rows = connection.execute(
+            "SELECT key, timestamp FROM api_cache WHERE key = ? OR key LIKE ?", (endpoint, endpoint + "?%")
+        ).fetchall()
+    return dict(rows)
+
+
+def read_cached_payload(key):
+    # The cached payload regardless of freshness, or None
+    entry = _read_cache_entry(canonical_cache_key(key))
+    return entry.data if entry is not None else None
 
 
-def fetch_data_from_api(url):
+def fetch_data_from_api(url, priority=PRIORITY_INTERACTIVE):
+    # Background refreshes are not essential and give way before the shared quota runs out.
+    # Returns None on a 429 (or while one still holds) and raises BudgetDeferredError when
+    # the local budget says no.
+    refusals = []
+
+    def spend_budget(attempt):
+        # Upstream meters every request, so each retry is paid for like the first attempt
+        acquisition = rate_budget.acquire(RATE_BUDGET_UPSTREAM, essential=priority == PRIORITY_INTERACTIVE)
+        if not acquisition.granted:
+            refusals.append(acquisition)
+        return acquisition.granted
+
     full_url = base_url + url
-    response = requests.get(full_url, headers=default_headers)
-    
+    # A 429 here means the plan quota is used up, retrying would only burn more of it
+    response = http_client.get(
+        full_url, headers=default_headers,
+        retry_status_codes=http_client.RETRY_STATUS_CODES - {429}, priority=priority,
+        before_attempt=spend_budget,
+    )
+
+    # A refusal on a retry wins over the 5xx it would have retried, so callers can still
+    # serve stale data or wait for the budget instead of seeing an HTTP error
+    if refusals:
+        if refusals[0].throttled:
+            print("API rate limit still in effect, skipping request:", url)
+            return None
+        raise BudgetDeferredError(refusals[0].resets_at)
     if response.status_code == 429:
-        st.session_state.rate_limited = True
+        rate_budget.report_throttled(RATE_BUDGET_UPSTREAM, http_client.retry_after_seconds(response))
         print("API rate limit reached.")
         return None
-    else:
-        st.session_state.rate_limited = False
     response.raise_for_status()
     return response.json()
 
 
-def fetch_data(url, query_params=None):
+def build_cache_key(url, query_params=None):
     full_url_with_params = url
     if query_params:
         param_str = "&".join([f"{k}={v}" for k, v in query_params.items()])
         full_url_with_params += "?" + param_str
+    return full_url_with_params
+
+
+def fetch_data(url, query_params=None):
+    full_url_with_params = build_cache_key(url, query_params)
+    key = canonical_cache_key(full_url_with_params)
+    stale_cache = st.session_state.setdefault(STALE_CACHE_STATE_KEY, {})
     
     cached_data = get_from_cache(full_url_with_params)
     if cached_data:
+        stale_cache.pop(key, None)
         return cached_data
+
+    # Serve the last good payload right away and refresh it off the script thread
+    entry = _read_cache_entry(key)
+    if entry is not None and entry.data and datetime.now() - entry.timestamp <= CACHE_MAX_STALE:
+        stale_cache[key] = entry.timestamp
+        st.session_state.rate_limited = False
+        revalidate_in_background(full_url_with_params)
+        return entry.data
     
-    print("Fetching new data for request:", full_url_with_params)
-    data = fetch_data_from_api(full_url_with_params)
+    # Sessions (and workers) missing the same key share one upstream request
+    try:
+        data = single_flight(key, lambda: _refresh_cache(full_url_with_params), cross_process=True)
+    except BudgetDeferredError as e:
+        print(f"{e}, skipping request:", full_url_with_params)
+        data = None
+    st.session_state.rate_limited = data is None
     if data is None:
         return []
-    write_to_cache(full_url_with_params, data)
-    return data
\ No newline at end of file
+    stale_cache.pop(key, None)
+    return data
+
+
+def get_stale_timestamp(url, query_params=None):
+    # When the payload fetch_data last returned for this request was stale, its timestamp
+    key = canonical_cache_key(build_cache_key(url, query_params))
+    return st.session_state.get(STALE_CACHE_STATE_KEY, {}).get(key)
+
+
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+
+def revalidate_in_background(key):
+    canonical_key = canonical_cache_key(key)
+    with _revalidating_lock:
+        if canonical_key in _revalidating:
+            return
+        _revalidating.add(canonical_key)
+
+    def revalidate():
+        try:
+            while True:
+                try:
+                    single_flight(canonical_key, lambda: _refresh_cache(key, PRIORITY_SPECULATIVE), cross_process=True)
+                    break
+                except BudgetDeferredError as e:
+                    # Nobody is waiting on this thread, so it waits for the budget instead
+                    if not wait_for_budget(e):
+                        raise
+        except Exception as e:
+            print(f"Background refresh failed for {key}: {e}")
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(canonical_key)
+
+    threading.Thread(target=revalidate, name="cache-revalidate", daemon=True).start()
+
+
+def _refresh_cache(key, priority=PRIORITY_INTERACTIVE):
+    # Another worker may have filled the cache while this one waited for the lock.
+    # Runs off the script thread too, so it must not touch st.session_state.
+    entry = _read_cache_entry(canonical_cache_key(key))
+    if entry is not None and entry.data and is_cache_fresh(canonical_cache_key(key), entry.timestamp):
+        return entry.data
+
+    print("Fetching new data for request:", key)
+    data = fetch_data_from_api(key, priority)
+    # A throttled or empty response never replaces the last good payload
+    if data:
+        write_to_cache(key, data)
+    return data
+
+
+def is_cache_entry_fresh(url, query_params=None):
+    key = canonical_cache_key(build_cache_key(url, query_params))
+    entry = _read_cache_entry(key)
+    return entry is not None and bool(entry.data) and is_cache_fresh(key, entry.timestamp)
+
+
+def refresh_cache_entry(url, query_params=None, priority=PRIORITY_BULK):
+    # Session free refresh for background jobs, returns None when upstream throttled and
+    # raises BudgetDeferredError when the local budget held the request back
+    key = build_cache_key(url, query_params)
+    return single_flight(canonical_cache_key(key), lambda: _refresh_cache(key, priority), cross_process=True)
+
+
+def get_remaining_api_budget():
+    return rate_budget.get_remaining_budget(RATE_BUDGET_UPSTREAM)
+
+
+def fetch_derived_data(url, query_params=None, build=None):
+    # Same as fetch_data, plus build(data) computed once per cached payload and shared by every
+    # session in this process. Callers must treat the derived value as read-only.
+    data = fetch_data(url, query_params)
+    with _memo_lock:
+        entry = _memo.get(canonical_cache_key(build_cache_key(url, query_params)))
+    if entry is None or entry.data is not data:
+        return data, build(data)
+    derived = entry.derived.get(build)
+    if derived is None:
+        derived = build(data)
+        with _memo_lock:
+            derived = entry.derived.setdefault(build, derived)
+    return data, derived
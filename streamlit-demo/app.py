@@ -1,4 +1,14 @@
 import streamlit as st
+from cache_warmer import start_cache_warmer
+
+
+@st.cache_resource
+def get_cache_warmer():
+    # Once per process, not once per session
+    return start_cache_warmer()
+
+
+get_cache_warmer()
 
 v1_page = st.Page('v1.py', title="Snow Report v1")
 v2_page = st.Page('v2.py', title="Snow Report v2")
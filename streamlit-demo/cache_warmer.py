@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from api import (
+    BudgetDeferredError, build_cache_key, is_cache_entry_fresh, read_cached_payload, refresh_cache_entry,
+    wait_for_budget,
+)
+from upstream_scheduler import CLASS_CONCURRENCY, PRIORITY_BULK, get_scheduler_metrics
+# Materializes state summaries as the warmer caches payloads
+import summaries  # noqa: F401
+
+# Hours between scheduled runs inside the app. Conditions go stale when the day rolls over, so
+# later runs the same day find them fresh and spend nothing. 0 turns the schedule off and leaves
+# warming to running this module from cron.
+CACHE_WARM_INTERVAL_HOURS = float(os.getenv("CACHE_WARM_INTERVAL_HOURS", "6"))
+# More workers than the bulk class may run upstream would only queue on the scheduler
+CACHE_WARM_CONCURRENCY = int(os.getenv("CACHE_WARM_CONCURRENCY", str(CLASS_CONCURRENCY[PRIORITY_BULK])))
+# Upstream requests one run may spend, payloads that are still fresh cost nothing
+CACHE_WARM_REQUEST_BUDGET = int(os.getenv("CACHE_WARM_REQUEST_BUDGET", "25"))
+
+
+def warm_cache(request_budget=CACHE_WARM_REQUEST_BUDGET, concurrency=CACHE_WARM_CONCURRENCY):
+    report = {"warmed": [], "fresh": [], "deferred": [], "skipped": [], "failed": []}
+    budget = [request_budget]
+    budget_lock = threading.Lock()
+    # (status, reason) once the run stops early: upstream throttled it, or the day's budget is spent
+    stopped = []
+
+    def stop(status, reason):
+        with budget_lock:
+            if not stopped:
+                stopped.append((status, reason))
+
+    def warm(label, url, query_params=None):
+        if is_cache_entry_fresh(url, query_params):
+            report["fresh"].append(label)
+            # Read straight from the cache, a refresh could still go upstream uncounted
+            return read_cached_payload(build_cache_key(url, query_params))
+        with budget_lock:
+            if stopped:
+                status, reason = stopped[0]
+                report[status].append(f"{label} ({reason})")
+                return None
+            if budget[0] <= 0:
+                report["skipped"].append(f"{label} (request budget spent)")
+                return None
+            budget[0] -= 1
+        while True:
+            try:
+                data = refresh_cache_entry(url, query_params)
+                break
+            except BudgetDeferredError as e:
+                # A full minute window is waited out, a spent daily one ends the run. Nothing
+                # went upstream, so the request goes back into the run's budget.
+                if stopped or not wait_for_budget(e):
+                    with budget_lock:
+                        budget[0] += 1
+                    reason = f"budget deferred until {datetime.fromtimestamp(e.resets_at):%H:%M}"
+                    stop("deferred", reason)
+                    report["deferred"].append(f"{label} ({reason})")
+                    return None
+            except Exception as e:
+                report["failed"].append(f"{label} ({e})")
+                return None
+        if data is None:
+            # Upstream answered 429 and further calls are blocked until it allows them again
+            stop("skipped", "rate limited")
+            report["failed"].append(f"{label} (rate limited)")
+        elif not data:
+            report["failed"].append(f"{label} (empty payload)")
+        else:
+            report["warmed"].append(label)
+        return data
+
+    resorts = warm("get_resorts_id", "get_resorts_id")
+    if not resorts:
+        return report
+
+    # An entry without a state has nothing to warm, it must not end the run
+    states = sorted(set(resort.get("state") for resort in resorts if isinstance(resort, dict) and resort.get("state")))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="cache-warmer") as executor:
+        futures = {state: executor.submit(warm, state, "get_snow_by_state", {"state": state}) for state in states}
+    for state, future in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            report["failed"].append(f"{state} ({e})")
+    return report
+
+
+def print_report(report):
+    for status in ("warmed", "fresh", "deferred", "skipped", "failed"):
+        print(f"{status.title()} ({len(report[status])}): {', '.join(sorted(report[status])) or '-'}")
+    for host, classes in get_scheduler_metrics().items():
+        for priority, metrics in classes.items():
+            print(f"{host} {priority}: {metrics['completed']} done, {metrics['waiting']} queued, "
+                  f"max wait {metrics['max_wait_ms']:.0f} ms")
+
+
+def _run_on_schedule(interval_seconds):
+    while True:
+        try:
+            print_report(warm_cache())
+        except Exception as e:
+            print(f"Cache warm run failed: {e}")
+        time.sleep(interval_seconds)
+
+
+def start_cache_warmer(interval_hours=CACHE_WARM_INTERVAL_HOURS):
+    if interval_hours <= 0:
+        return None
+    thread = threading.Thread(
+        target=_run_on_schedule, args=(interval_hours * 3600,), name="cache-warmer", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    print_report(warm_cache())
@@ -1,64 +1,99 @@
 import streamlit as st
-from api import fetch_data
-from utils import get_score_metric, get_overall_score
-
-def display_resort_card(resort_id):
-  selected_state = st.session_state.get("selected_state", None)
-  resort_data = fetch_data("get_snow_by_state", {
-     "state": selected_state
-  })
-
-  resort = next((resort for resort in resort_data if resort["id"] == resort_id), None)
+import pandas as pd
+from datetime import datetime
+from conditions import (
+    fetch_conditions, COL_RESORT, COL_OVERALL_SCORE, COL_LIFTS_TEXT, COL_TRAILS_TEXT,
+    COL_BASE_DEPTH_TEXT, COL_SNOWFALL_TEXT
+)
+from summaries import get_national_summary, get_state_summaries, get_state_summary
+from utils import get_score, get_score_metric
 
+def display_resort_card(resort):
   with st.container(border=True):
       col1a, col2a = st.columns([3, 1])
       with col1a:
-        st.header(resort.get("resort", "Unknown Resort"))
+        st.header(resort[COL_RESORT])
       with col2a:
-        overall_score, _ = get_overall_score(resort)
-        get_score_metric(overall_score, "Overall")
+        get_score_metric(resort[COL_OVERALL_SCORE], "Overall")
 
       col1, col2, col3, col4 = st.columns(4)
       with col1:
-        st.metric("Open Lifts", resort.get("open_lifts", "N/A", ))
+        st.metric("Open Lifts", resort[COL_LIFTS_TEXT])
       with col2:
-        st.metric("Open Trails", resort.get("open_trails", "N/A"))
+        st.metric("Open Trails", resort[COL_TRAILS_TEXT])
       with col3:
-        st.metric("Base Depth", f"{resort.get('base_depth', 'N/A')}")
+        st.metric("Base Depth", resort[COL_BASE_DEPTH_TEXT])
       with col4:
-        st.metric("New Snow", f"{resort.get('snowfall24h', 'N/A')}")
+        st.metric("New Snow", resort[COL_SNOWFALL_TEXT])
 
 
 def get_overall_card():
-  resort_data = fetch_data("get_snow_by_state", {
-     "state": st.session_state.get("selected_state", None)
-  })
-
-  if resort_data == []:  
+  state = st.session_state.get("selected_state", None)
+  # Loads (and on a miss fetches) the payload, whose summary is materialized when it is cached
+  if fetch_conditions(state).empty:
       return
+  summary = get_state_summary(state)
+  if summary is None:
+      return
+
+  with st.container(border=True):
+      col1a, col2a, col3a = st.columns([3, 1, 1])
+      with col1a:
+        st.header(f"Overall {(state or 'All').title()} Stats")
+      with col2a:
+        st.metric("Number of Resorts", summary["resorts"])
+      with col3a:
+        get_score_metric(summary["overall_score"], "Overall")
+      _get_availability(summary)
+
 
-  total_open_lifts = sum(int(resort.get("open_lifts", '0/0').replace('n/a', '0/0').split("/")[0]) for resort in resort_data)
-  total_lifts = sum(int(resort.get("open_lifts", '0/0').replace('n/a', '0/0').split("/")[1]) for resort in resort_data)
-  total_lift_percent = (total_open_lifts / total_lifts * 100) if total_lifts > 0 else 0
+def _get_availability(summary):
+  col1, col2 = st.columns(2)
+  with col1:
+    st.metric("Total Open Lifts", f"{summary['open_lifts']}/{summary['total_lifts']}")
+    st.progress(summary["lift_percent"] / 100.0, text=f"Lift Availability: {summary['lift_percent']:.1f}%")
+  with col2:
+    st.metric("Total Open Trails", f"{summary['open_trails']}/{summary['total_trails']}")
+    st.progress(summary["trail_percent"] / 100.0, text=f"Trail Availability: {summary['trail_percent']:.1f}%")
 
-  total_open_trails = sum(int(resort.get("open_trails", '0/0').replace('n/a', '0/0').split("/")[0]) for resort in resort_data)
-  total_trails = sum(int(resort.get("open_trails", '0/0').replace('n/a', '0/0').split("/")[1]) for resort in resort_data)
-  total_trail_percent = (total_open_trails / total_trails * 100) if total_trails > 0 else 0
+
+def get_national_card():
+  state_summaries = get_state_summaries()
+  if not state_summaries:
+      st.info("No state conditions have been loaded yet. Pick a state to load its resorts.")
+      return
+  national = get_national_summary(state_summaries)
 
   with st.container(border=True):
       col1a, col2a, col3a = st.columns([3, 1, 1])
       with col1a:
-        st.header(f"Overall {st.session_state.get('selected_state', 'All').title()} Stats")
+        st.header("Overall All States Stats")
+        st.caption(
+            f"Covers {national['states']} of {national['known_states']} states, only those whose conditions have been loaded. "
+            f"Oldest data from {datetime.fromisoformat(national['payload_timestamp']):%b %d, %I:%M %p}"
+        )
       with col2a:
-        st.metric("Number of Resorts", len(resort_data))
+        st.metric("Number of Resorts", national["resorts"])
       with col3a:
-        overall_score = (total_lift_percent + total_trail_percent) / 2
-        get_score_metric(overall_score, "Overall")
-      col1, col2 = st.columns(2)
-      with col1:
-        st.metric("Total Open Lifts", f"{total_open_lifts}/{total_lifts}")
-        st.progress(total_lift_percent / 100.0, text=f"Lift Availability: {total_lift_percent:.1f}%")
-      with col2:
-        st.metric("Total Open Trails", f"{total_open_trails}/{total_trails}")
-        st.progress(total_trail_percent / 100.0, text=f"Trail Availability: {total_trail_percent:.1f}%")
-      
\ No newline at end of file
+        get_score_metric(national["overall_score"], "Overall")
+      _get_availability(national)
+
+      st.write("#### Resorts by Score")
+      st.bar_chart(pd.Series(national["grade_counts"], name="Resorts"), horizontal=True)
+
+      if national["top_new_snow"]:
+        st.write("#### Most New Snow (24h)")
+        for resort in national["top_new_snow"]:
+          st.write(f"**{resort['resort']}**, {resort['state'].title()}: {resort['snowfall']:g}\"")
+
+  st.dataframe(
+      pd.DataFrame({
+          "State": [summary["state"].title() for summary in state_summaries],
+          "Resorts": [summary["resorts"] for summary in state_summaries],
+          "Open Lifts": [f"{summary['open_lifts']}/{summary['total_lifts']}" for summary in state_summaries],
+          "Open Trails": [f"{summary['open_trails']}/{summary['total_trails']}" for summary in state_summaries],
+          "Overall": [get_score(summary["overall_score"]) for summary in state_summaries],
+          "Overall (%)": [round(summary["overall_score"], 1) for summary in state_summaries],
+      }),
+      hide_index=True,
+  )
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from api import fetch_derived_data
+
+# Typed columns of a normalized get_snow_by_state payload, one row per resort indexed by id
+COL_RESORT = "resort"
+COL_STATE = "state"
+COL_OPEN_LIFTS = "open_lifts"
+COL_TOTAL_LIFTS = "total_lifts"
+COL_OPEN_TRAILS = "open_trails"
+COL_TOTAL_TRAILS = "total_trails"
+COL_LIFT_PERCENT = "lift_percent"
+COL_TRAIL_PERCENT = "trail_percent"
+COL_BASE_DEPTH_MIN = "base_depth_min"
+COL_BASE_DEPTH_MAX = "base_depth_max"
+COL_SNOWFALL_24H = "snowfall_24h"
+COL_OVERALL_SCORE = "overall_score"
+COL_GRADE = "grade"
+# The payload's own strings, kept for display
+COL_LIFTS_TEXT = "lifts_text"
+COL_TRAILS_TEXT = "trails_text"
+COL_BASE_DEPTH_TEXT = "base_depth_text"
+COL_SNOWFALL_TEXT = "snowfall_text"
+
+CONDITIONS_DTYPES = {
+    COL_RESORT: object,
+    COL_STATE: object,
+    COL_OPEN_LIFTS: np.int64,
+    COL_TOTAL_LIFTS: np.int64,
+    COL_OPEN_TRAILS: np.int64,
+    COL_TOTAL_TRAILS: np.int64,
+    COL_LIFT_PERCENT: np.float64,
+    COL_TRAIL_PERCENT: np.float64,
+    COL_BASE_DEPTH_MIN: np.float64,
+    COL_BASE_DEPTH_MAX: np.float64,
+    COL_SNOWFALL_24H: np.float64,
+    COL_OVERALL_SCORE: np.float64,
+    COL_GRADE: object,
+    COL_LIFTS_TEXT: object,
+    COL_TRAILS_TEXT: object,
+    COL_BASE_DEPTH_TEXT: object,
+    COL_SNOWFALL_TEXT: object,
+}
+
+# Same cut-offs as utils.get_score, highest first
+GRADE_THRESHOLDS = [(100, "A+"), (90, "A"), (75, "B"), (50, "C"), (25, "D")]
+
+SORT_OPTIONS = {
+    "Overall Score (High to Low)": (COL_OVERALL_SCORE, False),
+    "Overall Score (Low to High)": (COL_OVERALL_SCORE, True),
+    "Resort Name (A-Z)": (COL_RESORT, True),
+    "Resort Name (Z-A)": (COL_RESORT, False),
+}
+
+
+def _text(series):
+    return series.fillna("N/A").astype(str)
+
+
+def _parse_counts(series):
+    # "open/total" strings, "n/a" and anything unparseable count as 0/0
+    parts = series.fillna("").astype(str).str.extract(r"^\s*(\d+)\s*/\s*(\d+)\s*$")
+    return parts[0].fillna(0).astype(np.int64), parts[1].fillna(0).astype(np.int64)
+
+
+def _parse_inches(series):
+    # '74"' or a '45-71"' range, as (min, max) floats with NaN when missing
+    parts = series.fillna("").astype(str).str.extract(r"^\s*(\d+(?:\.\d+)?)(?:\s*-\s*(\d+(?:\.\d+)?))?")
+    low = parts[0].astype(float)
+    return low, parts[1].astype(float).fillna(low)
+
+
+def _percent(open_count, total_count):
+    return np.where(total_count > 0, open_count / np.maximum(total_count, 1) * 100, 0.0)
+
+
+def grade_scores(scores):
+    scores = np.asarray(scores, dtype=float)
+    return np.select([scores >= threshold for threshold, _ in GRADE_THRESHOLDS], [grade for _, grade in GRADE_THRESHOLDS], "F")
+
+
+def empty_conditions():
+    return pd.DataFrame(
+        {column: pd.Series(dtype=dtype) for column, dtype in CONDITIONS_DTYPES.items()},
+        index=pd.Index([], dtype=object, name="id"),
+    )
+
+
+def normalize_conditions(data):
+    resorts = [resort for resort in data or [] if isinstance(resort, dict) and "id" in resort]
+    # A state with no data skips the column work, which warns on empty frames
+    if not resorts:
+        return empty_conditions()
+    raw = pd.DataFrame(resorts)
+    raw = raw.reindex(columns=["id", "resort", "state", "open_lifts", "open_trails", "base_depth", "snowfall24h"])
+
+    open_lifts, total_lifts = _parse_counts(raw["open_lifts"])
+    open_trails, total_trails = _parse_counts(raw["open_trails"])
+    depth_min, depth_max = _parse_inches(raw["base_depth"])
+    snowfall, _ = _parse_inches(raw["snowfall24h"])
+    lift_percent = _percent(open_lifts, total_lifts)
+    trail_percent = _percent(open_trails, total_trails)
+    overall_score = (lift_percent + trail_percent) / 2
+
+    frame = pd.DataFrame({
+        COL_RESORT: raw["resort"].fillna("Unknown Resort").astype(str),
+        COL_STATE: raw["state"].fillna("").astype(str),
+        COL_OPEN_LIFTS: open_lifts,
+        COL_TOTAL_LIFTS: total_lifts,
+        COL_OPEN_TRAILS: open_trails,
+        COL_TOTAL_TRAILS: total_trails,
+        COL_LIFT_PERCENT: lift_percent,
+        COL_TRAIL_PERCENT: trail_percent,
+        COL_BASE_DEPTH_MIN: depth_min,
+        COL_BASE_DEPTH_MAX: depth_max,
+        COL_SNOWFALL_24H: snowfall,
+        COL_OVERALL_SCORE: overall_score,
+        COL_GRADE: grade_scores(overall_score),
+        COL_LIFTS_TEXT: _text(raw["open_lifts"]),
+        COL_TRAILS_TEXT: _text(raw["open_trails"]),
+        COL_BASE_DEPTH_TEXT: _text(raw["base_depth"]),
+        COL_SNOWFALL_TEXT: _text(raw["snowfall24h"]),
+    })
+    frame.index = pd.Index(raw["id"].astype(str), name="id")
+    return frame
+
+
+def fetch_conditions(state):
+    # Normalized once per cached payload, not once per rerun
+    _, conditions = fetch_derived_data("get_snow_by_state", {"state": state}, normalize_conditions)
+    return conditions
+
+
+def filter_conditions(conditions, search_query="", grades=None, new_snow=False, state=None, matched_ids=()):
+    # matched_ids (from the search index) are kept alongside plain substring matches
+    keep = np.ones(len(conditions), dtype=bool)
+    if state is not None:
+        keep &= (conditions[COL_STATE] == state).to_numpy()
+    if search_query:
+        keep &= (
+            conditions[COL_RESORT].str.lower().str.contains(search_query.lower(), regex=False)
+            | conditions.index.isin(matched_ids)
+        ).to_numpy()
+    if grades:
+        keep &= conditions[COL_GRADE].isin(grades).to_numpy()
+    if new_snow:
+        keep &= (conditions[COL_SNOWFALL_24H] > 0).to_numpy()
+    return conditions[keep]
+
+
+def sort_conditions(conditions, sort_option):
+    if sort_option not in SORT_OPTIONS:
+        return conditions
+    column, ascending = SORT_OPTIONS[sort_option]
+    return conditions.sort_values(column, ascending=ascending, kind="stable")
@@ -0,0 +1,19 @@
+import os
+import sqlite3
+
+CACHE_DIR = "cache"
+
+_initialized_schemas = set()
+
+
+def connect(filename, schema=None):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, filename)
+    connection = sqlite3.connect(path, timeout=30)
+    # WAL lets Streamlit workers read while another process writes
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    if schema and (path, schema) not in _initialized_schemas:
+        connection.executescript(schema)
+        _initialized_schemas.add((path, schema))
+    return connection
@@ -0,0 +1,128 @@
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from upstream_scheduler import PRIORITY_INTERACTIVE, get_scheduler
+
+CONNECT_TIMEOUT_SECONDS = 5
+READ_TIMEOUT_SECONDS = 30
+
+# Retries after the first attempt for throttling, upstream errors and dropped connections
+MAX_RETRIES = 3
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 0.5
+# Longest we will block a script thread for one wait; a longer Retry-After is handed back to the caller
+BACKOFF_MAX_SECONDS = 20
+
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+LATENCY_SAMPLES = 200
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+_stats_lock = threading.Lock()
+_host_stats = {}
+
+
+def _record(host, elapsed, status_code=None, retried=False, failed=False):
+    with _stats_lock:
+        stats = _host_stats.get(host)
+        if stats is None:
+            stats = _host_stats[host] = {
+                "requests": 0, "errors": 0, "retries": 0, "throttled": 0,
+                "latencies": deque(maxlen=LATENCY_SAMPLES),
+            }
+        stats["requests"] += 1
+        stats["latencies"].append(elapsed)
+        if retried:
+            stats["retries"] += 1
+        if status_code == 429:
+            stats["throttled"] += 1
+        if failed or (status_code is not None and status_code >= 500):
+            stats["errors"] += 1
+
+
+def get_host_stats():
+    summary = {}
+    with _stats_lock:
+        for host, stats in _host_stats.items():
+            latencies = sorted(stats["latencies"])
+            summary[host] = {
+                "requests": stats["requests"],
+                "errors": stats["errors"],
+                "retries": stats["retries"],
+                "throttled": stats["throttled"],
+                "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+                "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+                "max_ms": latencies[-1] * 1000 if latencies else None,
+            }
+    return summary
+
+
+def retry_after_seconds(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_seconds(attempt):
+    # Full jitter keeps sessions that failed together from retrying together
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def get(
+    url, params=None, headers=None, retry_status_codes=RETRY_STATUS_CODES, priority=PRIORITY_INTERACTIVE,
+    before_attempt=None,
+):
+    # before_attempt(attempt) runs ahead of every attempt, retries included, so metered hosts
+    # can count each one. When it returns False nothing more is sent and the last response
+    # comes back, or None if there was none.
+    host = urlsplit(url).netloc
+    scheduler = get_scheduler(host)
+    response = None
+    for attempt in range(MAX_RETRIES + 1):
+        if before_attempt is not None and not before_attempt(attempt):
+            return response
+        try:
+            # The slot is held per attempt, never across a backoff sleep
+            with scheduler.slot(priority):
+                started = time.perf_counter()
+                response = _session.get(
+                    url, params=params, headers=headers,
+                    timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS),
+                )
+        except (requests.ConnectionError, requests.Timeout):
+            _record(host, time.perf_counter() - started, retried=attempt > 0, failed=True)
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(_backoff_seconds(attempt))
+            continue
+
+        _record(host, time.perf_counter() - started, response.status_code, retried=attempt > 0)
+        if response.status_code not in retry_status_codes or attempt == MAX_RETRIES:
+            return response
+
+        delay = retry_after_seconds(response)
+        if delay is None:
+            delay = _backoff_seconds(attempt)
+        if delay > BACKOFF_MAX_SECONDS:
+            return response
+        print(f"{host} returned {response.status_code}, retrying in {delay:.1f}s")
+        time.sleep(delay)
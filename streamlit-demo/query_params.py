@@ -1,7 +1,7 @@
 import streamlit as st
 import json
 
-PERSIST_KEYS = ["selected_state", "resort_search_query", "filter", 'sort']
+PERSIST_KEYS = ["selected_state", "resort_search_query", "filter", "sort", "page", "compact_view"]
 
 def determine_if_should_persist(key, value):
     if key in PERSIST_KEYS:
@@ -29,5 +29,5 @@ def read_query_params():
 
 def set_query_params():
     if "query_params_initialized" in st.session_state:
-        params_to_set = {k: v for k, v in st.session_state.items() if k in PERSIST_KEYS and (isinstance(v, bool) and v is not False) or (not isinstance(v, bool))}
+        params_to_set = {k: v for k, v in st.session_state.items() if k in PERSIST_KEYS and ((isinstance(v, bool) and v is not False) or (not isinstance(v, bool)))}
         st.query_params.state = json.dumps(params_to_set)
\ No newline at end of file
@@ -0,0 +1,129 @@
+import os
+import time
+from collections import namedtuple
+from contextlib import closing
+
+from db import connect
+
+RATE_BUDGET_DB = "rate_budget.db"
+
+# Plan limits per upstream as (requests, window seconds). Windows are fixed and aligned to
+# the epoch, so the daily window resets at midnight UTC like the RapidAPI quota does.
+RATE_LIMITS = {
+    "rapidapi": [
+        (int(os.getenv("RAPIDAPI_REQUESTS_PER_MINUTE", "10")), 60),
+        (int(os.getenv("RAPIDAPI_REQUESTS_PER_DAY", "50")), 86400),
+    ],
+}
+# Share of every window held back for requests a user is waiting on
+ESSENTIAL_RESERVE = float(os.getenv("RATE_BUDGET_ESSENTIAL_RESERVE", "0.2"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_budget (
+    upstream TEXT NOT NULL,
+    window_seconds INTEGER NOT NULL,
+    window_start INTEGER NOT NULL,
+    used INTEGER NOT NULL,
+    PRIMARY KEY (upstream, window_seconds)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rate_blocks (
+    upstream TEXT PRIMARY KEY,
+    blocked_until REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+# What acquire() decided. A refused request spends nothing: throttled means a 429 block from
+# upstream still holds, otherwise a window is full. resets_at (epoch seconds) is when that ends.
+Acquisition = namedtuple("Acquisition", ["granted", "throttled", "resets_at"])
+
+
+def _connect():
+    connection = connect(RATE_BUDGET_DB, SCHEMA)
+    # Explicit transactions, BEGIN IMMEDIATE serializes budget checks across workers
+    connection.isolation_level = None
+    return closing(connection)
+
+
+def _window_start(now, window_seconds):
+    return int(now // window_seconds) * window_seconds
+
+
+def _usage(connection, upstream, now):
+    used = {
+        window_seconds: count
+        for window_seconds, window_start, count in connection.execute(
+            "SELECT window_seconds, window_start, used FROM rate_budget WHERE upstream = ?", (upstream,)
+        )
+        if window_start == _window_start(now, window_seconds)
+    }
+    return [(limit, window_seconds, used.get(window_seconds, 0)) for limit, window_seconds in RATE_LIMITS[upstream]]
+
+
+def _blocked_until(connection, upstream):
+    row = connection.execute("SELECT blocked_until FROM rate_blocks WHERE upstream = ?", (upstream,)).fetchone()
+    return row[0] if row else 0.0
+
+
+def acquire(upstream, essential=True):
+    # Takes one request from every window, or refuses without spending anything
+    now = time.time()
+    with _connect() as connection:
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            blocked_until = _blocked_until(connection, upstream)
+            if blocked_until > now:
+                return Acquisition(False, True, blocked_until)
+            usage = _usage(connection, upstream, now)
+            full_until = [
+                _window_start(now, window_seconds) + window_seconds
+                for limit, window_seconds, used in usage
+                if used >= (limit if essential else int(limit * (1 - ESSENTIAL_RESERVE)))
+            ]
+            if full_until:
+                # Every full window has to roll over before the request fits
+                return Acquisition(False, False, max(full_until))
+            for limit, window_seconds, used in usage:
+                connection.execute(
+                    "INSERT OR REPLACE INTO rate_budget (upstream, window_seconds, window_start, used) VALUES (?, ?, ?, ?)",
+                    (upstream, window_seconds, _window_start(now, window_seconds), used + 1),
+                )
+            return Acquisition(True, False, None)
+        finally:
+            connection.execute("COMMIT")
+
+
+def report_throttled(upstream, retry_after_seconds=None):
+    # Upstream said no: nobody calls it again until Retry-After, or the shortest window rolls over
+    now = time.time()
+    if retry_after_seconds is None:
+        window_seconds = min(window for _, window in RATE_LIMITS[upstream])
+        blocked_until = _window_start(now, window_seconds) + window_seconds
+    else:
+        blocked_until = now + retry_after_seconds
+    with _connect() as connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO rate_blocks (upstream, blocked_until) VALUES (?, ?)", (upstream, blocked_until)
+        )
+
+
+def get_remaining_budget(upstream):
+    now = time.time()
+    with _connect() as connection:
+        usage = _usage(connection, upstream, now)
+        blocked = _blocked_until(connection, upstream) > now
+    windows = [
+        {
+            "window_seconds": window_seconds,
+            "limit": limit,
+            "remaining": 0 if blocked else max(0, limit - used),
+            "resets_at": _window_start(now, window_seconds) + window_seconds,
+        }
+        for limit, window_seconds, used in usage
+    ]
+    # Short windows refill within a minute, only the longest one says the quota is running out
+    longest = max(windows, key=lambda window: window["window_seconds"])
+    return {
+        "remaining": min(window["remaining"] for window in windows),
+        "low": longest["remaining"] <= longest["limit"] * ESSENTIAL_RESERVE,
+        "windows": windows,
+    }
@@ -0,0 +1,177 @@
+import re
+import unicodedata
+from collections import namedtuple
+
+import numpy as np
+import streamlit as st
+from api import get_cached_payload_timestamps, read_cached_payload
+from v2_catalog import get_resort_catalog, split_locations
+
+RAPIDAPI_COUNTRY = "United States"
+DEFAULT_RESULT_COUNT = 8
+# Weakest word match (trigram similarity) that still counts
+MIN_SIMILARITY = 0.3
+# A query word that only starts a name's word scores a little below one matching it exactly
+PREFIX_SCORE = 0.9
+
+# catalog_row is set for ski_areas.json resorts (v2), rapidapi_id for get_resorts_id ones (v1)
+SearchEntry = namedtuple("SearchEntry", ["name", "region", "country", "catalog_row", "rapidapi_id"])
+SearchResult = namedtuple("SearchResult", ["entry", "score"])
+
+
+def fold(text):
+    # "Val-d'Isère" -> "val d isere": accents stripped, case folded, punctuation as spaces
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def _trigrams(folded):
+    padded = f"  {folded} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "tokens")
+
+    def __init__(self):
+        self.children = {}
+        self.tokens = []
+
+
+class ResortSearchIndex:
+    # Every distinct word of every name is indexed twice: in a prefix trie for typeahead, and
+    # under its trigrams for typo tolerance. A query word scores against a name's best word,
+    # and a name scores the mean over query words weighted by length, so "d" counts for little.
+    def __init__(self, entries):
+        self.entries = tuple(entries)
+        self._folded = [fold(entry.name) for entry in self.entries]
+        self._word_counts = np.array([max(1, len(folded.split())) for folded in self._folded], dtype=np.float64)
+
+        vocabulary = {}
+        token_entries = []
+        for position, folded in enumerate(self._folded):
+            for token in set(folded.split()):
+                token_id = vocabulary.get(token)
+                if token_id is None:
+                    token_id = vocabulary[token] = len(vocabulary)
+                    token_entries.append([])
+                token_entries[token_id].append(position)
+        self._vocabulary = vocabulary
+        self._token_entries = [np.array(positions, dtype=np.int32) for positions in token_entries]
+
+        self._trie = _TrieNode()
+        postings = {}
+        trigram_counts = []
+        for token, token_id in vocabulary.items():
+            node = self._trie
+            for char in token:
+                node = node.children.setdefault(char, _TrieNode())
+                node.tokens.append(token_id)
+            trigrams = _trigrams(token)
+            trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                postings.setdefault(trigram, []).append(token_id)
+        self._postings = {trigram: np.array(token_ids, dtype=np.int32) for trigram, token_ids in postings.items()}
+        self._trigram_counts = np.array(trigram_counts, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _token_scores(self, query_token):
+        # Score of the query word against every indexed word
+        trigrams = _trigrams(query_token)
+        shared = np.zeros(len(self._trigram_counts), dtype=np.float64)
+        for trigram in trigrams:
+            token_ids = self._postings.get(trigram)
+            if token_ids is not None:
+                shared[token_ids] += 1
+        scores = shared / (len(trigrams) + self._trigram_counts - shared)
+
+        node = self._trie
+        for char in query_token:
+            node = node.children.get(char)
+            if node is None:
+                break
+        else:
+            scores[node.tokens] = np.maximum(scores[node.tokens], PREFIX_SCORE)
+            exact = self._vocabulary.get(query_token)
+            if exact is not None:
+                scores[exact] = 1.0
+        return scores
+
+    def search(self, query, k=DEFAULT_RESULT_COUNT, predicate=None):
+        folded_query = fold(query)
+        if not folded_query:
+            return []
+        query_tokens = folded_query.split()
+
+        scores = np.zeros(len(self.entries), dtype=np.float64)
+        for query_token in query_tokens:
+            weight = len(query_token) / len(folded_query.replace(" ", ""))
+            token_scores = self._token_scores(query_token)
+            best = np.zeros(len(self.entries), dtype=np.float64)
+            for token_id in np.flatnonzero(token_scores >= MIN_SIMILARITY):
+                positions = self._token_entries[token_id]
+                best[positions] = np.maximum(best[positions], token_scores[token_id])
+            scores += best * weight
+
+        candidates = np.flatnonzero(scores >= MIN_SIMILARITY)
+        starts = np.array([self._folded[position].startswith(folded_query) for position in candidates], dtype=bool)
+        # Whole-name prefix matches first, then names with fewer words left unmatched
+        ranked = scores[candidates] + starts * 0.5 + len(query_tokens) / np.maximum(self._word_counts[candidates], len(query_tokens)) * 0.25
+
+        results = []
+        for i in np.lexsort((np.array([self._folded[position] for position in candidates]), -ranked)):
+            entry = self.entries[candidates[i]]
+            if predicate is not None and not predicate(entry):
+                continue
+            results.append(SearchResult(entry, float(ranked[i])))
+            if len(results) == k:
+                break
+        return results
+
+
+def build_search_entries(catalog, rapidapi_resorts):
+    entries = []
+    by_location = {}
+    for row in range(len(catalog)):
+        name = catalog.name(row)
+        if not name:
+            continue
+        country = split_locations(catalog.country(row))[0]
+        region = split_locations(catalog.region(row))[0]
+        by_location.setdefault((fold(name), fold(region)), len(entries))
+        entries.append(SearchEntry(name, region, country, row, None))
+
+    # Resorts in both datasets become one result that can open either page
+    for resort in rapidapi_resorts or []:
+        if not isinstance(resort, dict) or not resort.get("resort"):
+            continue
+        region = (resort.get("state") or "").replace("-", " ").title()
+        position = by_location.get((fold(resort["resort"]), fold(region)))
+        if position is not None and entries[position].rapidapi_id is None:
+            entries[position] = entries[position]._replace(rapidapi_id=resort.get("id"))
+        else:
+            entries.append(SearchEntry(resort["resort"], region, RAPIDAPI_COUNTRY, None, resort.get("id")))
+    return entries
+
+
+@st.cache_resource(max_entries=2)
+def _build_resort_search_index(catalog_version, rapidapi_timestamp):
+    return ResortSearchIndex(build_search_entries(get_resort_catalog(), read_cached_payload("get_resorts_id")))
+
+
+def get_resort_search_index():
+    # Built from the catalog, never by fetching from RapidAPI: get_resorts_id ids are merged
+    # in only from a payload that is already cached, and a new one rebuilds the index
+    rapidapi_timestamp = get_cached_payload_timestamps("get_resorts_id").get("get_resorts_id")
+    return _build_resort_search_index(get_resort_catalog().version, rapidapi_timestamp)
+
+
+def search_resort_ids(query, state):
+    # get_resorts_id ids of the resorts in a v1 state matching the query
+    results = get_resort_search_index().search(
+        query, k=None, predicate=lambda entry: entry.rapidapi_id is not None and fold(entry.region) == fold(state),
+    )
+    return [result.entry.rapidapi_id for result in results]
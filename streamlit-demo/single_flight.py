@@ -0,0 +1,73 @@
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+
+from db import CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, coalescing is then per process only
+    fcntl = None
+
+LOCK_DIR = os.path.join(CACHE_DIR, "locks")
+# Keys hash onto a fixed set of lock files so the directory never grows
+LOCK_STRIPES = 64
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+@contextmanager
+def _process_lock(key):
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    stripe = int(hashlib.sha256(key.encode("utf-8")).hexdigest(), 16) % LOCK_STRIPES
+    with open(os.path.join(LOCK_DIR, f"{stripe}.lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def single_flight(key, fn, cross_process=False):
+    # Concurrent callers with the same key wait for the first caller's result instead of
+    # repeating the work. With cross_process the first caller in each worker also takes a
+    # file lock, so fn should re-check the shared cache before going upstream.
+    with _calls_lock:
+        call = _calls.get(key)
+        is_leader = call is None
+        if is_leader:
+            call = _calls[key] = _Call()
+
+    if not is_leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        if cross_process:
+            with _process_lock(key):
+                call.result = fn()
+        else:
+            call.result = fn()
+        return call.result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            del _calls[key]
+        call.done.set()
@@ -0,0 +1,178 @@
+import json
+import threading
+from contextlib import closing
+from urllib.parse import parse_qsl
+
+from api import get_cached_payload_timestamps, read_cached_payload, register_cache_write_hook
+from conditions import (
+    normalize_conditions, COL_RESORT, COL_OPEN_LIFTS, COL_TOTAL_LIFTS, COL_OPEN_TRAILS,
+    COL_TOTAL_TRAILS, COL_GRADE, COL_SNOWFALL_24H, GRADE_THRESHOLDS
+)
+from db import connect
+
+SUMMARY_DB = "summaries.db"
+# Selector value for the national view
+ALL_STATES = "all"
+STATE_ENDPOINT = "get_snow_by_state"
+GRADES = [grade for _, grade in GRADE_THRESHOLDS] + ["F"]
+TOP_NEW_SNOW_COUNT = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state_summaries (
+    state TEXT PRIMARY KEY,
+    payload_timestamp TEXT NOT NULL,
+    resorts INTEGER NOT NULL,
+    open_lifts INTEGER NOT NULL,
+    total_lifts INTEGER NOT NULL,
+    open_trails INTEGER NOT NULL,
+    total_trails INTEGER NOT NULL,
+    grade_counts TEXT NOT NULL,
+    top_new_snow TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+SUMMARY_COLUMNS = [
+    "state", "payload_timestamp", "resorts", "open_lifts", "total_lifts",
+    "open_trails", "total_trails", "grade_counts", "top_new_snow",
+]
+
+
+def _connect():
+    return closing(connect(SUMMARY_DB, SCHEMA))
+
+
+def _state_from_key(key):
+    url, _, query = key.partition("?")
+    if url != STATE_ENDPOINT:
+        return None
+    return dict(parse_qsl(query)).get("state") or None
+
+
+def _with_percentages(summary):
+    summary["lift_percent"] = summary["open_lifts"] / summary["total_lifts"] * 100 if summary["total_lifts"] > 0 else 0
+    summary["trail_percent"] = summary["open_trails"] / summary["total_trails"] * 100 if summary["total_trails"] > 0 else 0
+    summary["overall_score"] = (summary["lift_percent"] + summary["trail_percent"]) / 2
+    return summary
+
+
+def summarize_conditions(state, payload_timestamp, conditions):
+    totals = conditions[[COL_OPEN_LIFTS, COL_TOTAL_LIFTS, COL_OPEN_TRAILS, COL_TOTAL_TRAILS]].sum()
+    grade_counts = conditions[COL_GRADE].value_counts()
+    new_snow = conditions[conditions[COL_SNOWFALL_24H] > 0].nlargest(TOP_NEW_SNOW_COUNT, COL_SNOWFALL_24H)
+    return {
+        "state": state,
+        "payload_timestamp": payload_timestamp,
+        "resorts": len(conditions),
+        "open_lifts": int(totals[COL_OPEN_LIFTS]),
+        "total_lifts": int(totals[COL_TOTAL_LIFTS]),
+        "open_trails": int(totals[COL_OPEN_TRAILS]),
+        "total_trails": int(totals[COL_TOTAL_TRAILS]),
+        "grade_counts": {grade: int(grade_counts.get(grade, 0)) for grade in GRADES},
+        "top_new_snow": [
+            {"resort": resort, "state": state, "snowfall": float(snowfall)}
+            for resort, snowfall in zip(new_snow[COL_RESORT], new_snow[COL_SNOWFALL_24H])
+        ],
+    }
+
+
+def materialize_state_summary(key, timestamp, data):
+    state = _state_from_key(key)
+    if state is None:
+        return None
+    summary = summarize_conditions(state, timestamp, normalize_conditions(data))
+    with _connect() as connection, connection:
+        # An older payload never overwrites the summary of a newer one
+        connection.execute(
+            f"INSERT INTO state_summaries ({', '.join(SUMMARY_COLUMNS)}) VALUES ({', '.join('?' * len(SUMMARY_COLUMNS))}) "
+            "ON CONFLICT (state) DO UPDATE SET "
+            + ", ".join(f"{column} = excluded.{column}" for column in SUMMARY_COLUMNS[1:])
+            + " WHERE excluded.payload_timestamp >= state_summaries.payload_timestamp",
+            [
+                json.dumps(summary[column]) if column in ("grade_counts", "top_new_snow") else summary[column]
+                for column in SUMMARY_COLUMNS
+            ],
+        )
+    return summary
+
+
+register_cache_write_hook(STATE_ENDPOINT, materialize_state_summary)
+
+
+_backfilled = threading.Event()
+_backfill_lock = threading.Lock()
+
+
+def _backfill_summaries():
+    # Payloads cached before any process had the write hook (the JSON migration, an older
+    # deployment) are summarized once per process. After that the hook keeps rows current,
+    # so page reruns only read the summary table.
+    if _backfilled.is_set():
+        return
+    with _backfill_lock:
+        if _backfilled.is_set():
+            return
+        summarized = {row["state"]: row["payload_timestamp"] for row in _read_summaries()}
+        for key, timestamp in get_cached_payload_timestamps(STATE_ENDPOINT).items():
+            key_state = _state_from_key(key)
+            if key_state is None or summarized.get(key_state, "") >= timestamp:
+                continue
+            data = read_cached_payload(key)
+            if data is not None:
+                materialize_state_summary(key, timestamp, data)
+        _backfilled.set()
+
+
+def _read_summaries(state=None):
+    query = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM state_summaries"
+    with _connect() as connection:
+        if state is None:
+            rows = connection.execute(query + " ORDER BY state").fetchall()
+        else:
+            rows = connection.execute(query + " WHERE state = ?", (state,)).fetchall()
+    summaries = []
+    for row in rows:
+        summary = dict(zip(SUMMARY_COLUMNS, row))
+        summary["grade_counts"] = json.loads(summary["grade_counts"])
+        summary["top_new_snow"] = json.loads(summary["top_new_snow"])
+        summaries.append(_with_percentages(summary))
+    return summaries
+
+
+def get_state_summaries():
+    _backfill_summaries()
+    return _read_summaries()
+
+
+def get_state_summary(state):
+    _backfill_summaries()
+    summaries = _read_summaries(state)
+    return summaries[0] if summaries else None
+
+
+def count_known_states():
+    # States in the cached resort list, read without fetching it; 0 when it is not cached
+    resorts = read_cached_payload("get_resorts_id") or []
+    return len({resort.get("state") for resort in resorts if isinstance(resort, dict) and resort.get("state")})
+
+
+def get_national_summary(state_summaries=None):
+    # Rolled up from the per-state rows only, no payload is read
+    if state_summaries is None:
+        state_summaries = get_state_summaries()
+    national = {
+        # Only states whose conditions have been loaded are summarized
+        "states": len(state_summaries),
+        "known_states": max(count_known_states(), len(state_summaries)),
+        "payload_timestamp": min((summary["payload_timestamp"] for summary in state_summaries), default=None),
+        "grade_counts": {grade: 0 for grade in GRADES},
+    }
+    for column in ("resorts", "open_lifts", "total_lifts", "open_trails", "total_trails"):
+        national[column] = sum(summary[column] for summary in state_summaries)
+    for summary in state_summaries:
+        for grade, count in summary["grade_counts"].items():
+            national["grade_counts"][grade] += count
+    national["top_new_snow"] = sorted(
+        (resort for summary in state_summaries for resort in summary["top_new_snow"]),
+        key=lambda resort: resort["snowfall"], reverse=True,
+    )[:TOP_NEW_SNOW_COUNT]
+    return _with_percentages(national)
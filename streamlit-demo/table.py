@@ -1,54 +1,105 @@
+import math
 import streamlit as st
-from api import fetch_data
 from cards import display_resort_card
-from utils import get_overall_score
+from conditions import (
+    fetch_conditions, filter_conditions, sort_conditions, COL_RESORT, COL_GRADE, COL_OVERALL_SCORE,
+    COL_LIFTS_TEXT, COL_TRAILS_TEXT, COL_BASE_DEPTH_TEXT, COL_SNOWFALL_24H
+)
+from query_params import set_query_params
+from search_index import search_resort_ids
+
+# Resorts per page; only the current page is rendered, whatever the state's size
+CARD_PAGE_SIZE = 10
+TABLE_PAGE_SIZE = 50
+
+
+def _get_page(resort_count, page_size):
+  # Back to the first page whenever the list itself changes, but not on the run that restores
+  # the page from the URL
+  filters = st.session_state.get('filter', {})
+  signature = (
+      st.session_state.get('selected_state'), st.session_state.get('resort_search_query', ""),
+      tuple(filters.get('overall_score', [])), filters.get('new_snow', False),
+      st.session_state.get('sort'), st.session_state.get('compact_view', False),
+  )
+  previous = st.session_state.get('page_signature')
+  st.session_state.page_signature = signature
+  page_count = max(1, math.ceil(resort_count / page_size))
+  stored_page = st.session_state.get('page', 1)
+  page = 1 if previous is not None and previous != signature else stored_page
+  st.session_state.page = min(max(1, int(page)), page_count)
+  if st.session_state.page != stored_page:
+    # The URL was written at the top of this run, before the page count was known
+    set_query_params()
+  return page_count
+
+
+def _get_pager(page_count):
+  if page_count <= 1:
+    return
+
+  def turn_page(offset):
+    st.session_state.page = min(max(1, st.session_state.page + offset), page_count)
+
+  col1, col2, col3 = st.columns([1, 2, 1], vertical_alignment="center")
+  with col1:
+    st.button("← Previous", key="page_previous", on_click=turn_page, args=(-1,), disabled=st.session_state.page <= 1)
+  with col2:
+    st.write(f"Page {st.session_state.page} of {page_count}")
+  with col3:
+    st.button("Next →", key="page_next", on_click=turn_page, args=(1,), disabled=st.session_state.page >= page_count)
+
+
+def _get_compact_table(resorts):
+  st.dataframe(
+      resorts[[COL_RESORT, COL_GRADE, COL_OVERALL_SCORE, COL_LIFTS_TEXT, COL_TRAILS_TEXT, COL_BASE_DEPTH_TEXT, COL_SNOWFALL_24H]],
+      hide_index=True,
+      column_config={
+          COL_RESORT: "Resort",
+          COL_GRADE: "Overall",
+          COL_OVERALL_SCORE: st.column_config.ProgressColumn("Score", format="%.0f%%", min_value=0, max_value=100),
+          COL_LIFTS_TEXT: "Open Lifts",
+          COL_TRAILS_TEXT: "Open Trails",
+          COL_BASE_DEPTH_TEXT: "Base Depth",
+          COL_SNOWFALL_24H: st.column_config.NumberColumn("New Snow (in)", format="%g"),
+      },
+  )
+
 
 def get_resort_table():
-  resort_results = fetch_data("get_snow_by_state", {"state": st.session_state.selected_state})
+  conditions = fetch_conditions(st.session_state.selected_state)
 
   if 'selected_state' in st.session_state:
-      filtered_resorts = [resort for resort in resort_results if resort['state'] == st.session_state.selected_state]
-  
-      search_query = st.session_state.get("resort_search_query", "").lower()
-      searched_resorts = [resort for resort in filtered_resorts if search_query in resort['resort'].lower()]
-
-      applied_filters_resorts = searched_resorts
-    
-      if 'filter' in st.session_state:
-          filters = st.session_state['filter']
-          # Overall score
-          if 'overall_score' in filters and filters['overall_score'] != []:
-              applied_filters_resorts = [resort for resort in applied_filters_resorts if get_overall_score(resort)[1] in filters['overall_score']]
-          # New snow
-          if 'new_snow' in filters and filters['new_snow']:
-              applied_filters_resorts = [resort for resort in applied_filters_resorts if float(resort.get('snowfall24h', "0\"").replace('\"', '')) > 0]
+      filters = st.session_state.get('filter', {})
+      search_query = st.session_state.get("resort_search_query", "")
+      applied_filters_resorts = filter_conditions(
+          conditions,
+          search_query=search_query,
+          matched_ids=search_resort_ids(search_query, st.session_state.selected_state) if search_query else (),
+          grades=filters.get('overall_score'),
+          new_snow=filters.get('new_snow', False),
+          state=st.session_state.selected_state,
+      )
       col1a, col2a, col3a = st.columns([4, 2, 4])
       with col1a:
           pass
       with col2a:
         st.write(f"#### {len(applied_filters_resorts)} resorts")
       with col3a:
-          pass
-      
+          st.toggle("Compact table", key="compact_view")
+
+      compact_view = st.session_state.get('compact_view', False)
+      page_size = TABLE_PAGE_SIZE if compact_view else CARD_PAGE_SIZE
+      page_count = _get_page(len(applied_filters_resorts), page_size)
+
       ## Sorting
-      if 'sort' in st.session_state:
-          sort_option = st.session_state['sort']
-          reverse = False
-          if sort_option == "Resort Name (A-Z)":
-              key_func = lambda x: x['resort']
-          elif sort_option == "Resort Name (Z-A)":
-              key_func = lambda x: x['resort']
-              reverse = True
-          elif sort_option == "Overall Score (High to Low)":
-              key_func = lambda x: get_overall_score(x)[0]
-              reverse = True
-          elif sort_option == "Overall Score (Low to High)":
-              key_func = lambda x: get_overall_score(x)[0]
-          else:
-              key_func = None
-
-          if key_func is not None:
-              
-              applied_filters_resorts = sorted(applied_filters_resorts, key=key_func, reverse=reverse)
-      for resort in applied_filters_resorts:
-          display_resort_card(resort['id'])
\ No newline at end of file
+      applied_filters_resorts = sort_conditions(applied_filters_resorts, st.session_state.get('sort'))
+      start = (st.session_state.page - 1) * page_size
+      page_resorts = applied_filters_resorts.iloc[start:start + page_size]
+
+      if compact_view:
+          _get_compact_table(page_resorts)
+      else:
+          for _, resort in page_resorts.iterrows():
+              display_resort_card(resort)
+      _get_pager(page_count)
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_SPECULATIVE = "speculative"
+PRIORITY_BULK = "bulk"
+# Most urgent first
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_SPECULATIVE, PRIORITY_BULK)
+
+# In-flight requests per host and class. Lower classes can never fill the host, so a page
+# load always has a free slot even while a warm-up job is running.
+HOST_CONCURRENCY = int(os.getenv("UPSTREAM_HOST_CONCURRENCY", "6"))
+CLASS_CONCURRENCY = {
+    PRIORITY_INTERACTIVE: HOST_CONCURRENCY,
+    PRIORITY_SPECULATIVE: int(os.getenv("UPSTREAM_SPECULATIVE_CONCURRENCY", "2")),
+    PRIORITY_BULK: int(os.getenv("UPSTREAM_BULK_CONCURRENCY", "1")),
+}
+
+
+class UpstreamScheduler:
+    def __init__(self, host_concurrency=HOST_CONCURRENCY, class_concurrency=CLASS_CONCURRENCY):
+        self.host_concurrency = host_concurrency
+        self.class_concurrency = dict(class_concurrency)
+        self._condition = threading.Condition()
+        self._waiting = {priority: 0 for priority in PRIORITIES}
+        self._running = {priority: 0 for priority in PRIORITIES}
+        self._completed = {priority: 0 for priority in PRIORITIES}
+        self._total_wait = {priority: 0.0 for priority in PRIORITIES}
+        self._max_wait = {priority: 0.0 for priority in PRIORITIES}
+
+    def _can_start(self, priority):
+        if self._running[priority] >= self.class_concurrency[priority]:
+            return False
+        if sum(self._running.values()) >= self.host_concurrency:
+            return False
+        # Deferred while anything more urgent is queued
+        more_urgent = PRIORITIES[:PRIORITIES.index(priority)]
+        return not any(self._waiting[other] for other in more_urgent)
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_INTERACTIVE):
+        started = time.perf_counter()
+        with self._condition:
+            self._waiting[priority] += 1
+            try:
+                while not self._can_start(priority):
+                    self._condition.wait()
+            finally:
+                self._waiting[priority] -= 1
+            self._running[priority] += 1
+            waited = time.perf_counter() - started
+            self._total_wait[priority] += waited
+            self._max_wait[priority] = max(self._max_wait[priority], waited)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._running[priority] -= 1
+                self._completed[priority] += 1
+                self._condition.notify_all()
+
+    def metrics(self):
+        with self._condition:
+            return {
+                priority: {
+                    "waiting": self._waiting[priority],
+                    "running": self._running[priority],
+                    "limit": self.class_concurrency[priority],
+                    "completed": self._completed[priority],
+                    "avg_wait_ms": self._total_wait[priority] / self._completed[priority] * 1000
+                    if self._completed[priority] else None,
+                    "max_wait_ms": self._max_wait[priority] * 1000,
+                }
+                for priority in PRIORITIES
+            }
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(host):
+    with _schedulers_lock:
+        scheduler = _schedulers.get(host)
+        if scheduler is None:
+            scheduler = _schedulers[host] = UpstreamScheduler()
+        return scheduler
+
+
+def get_scheduler_metrics():
+    with _schedulers_lock:
+        schedulers = dict(_schedulers)
+    return {host: scheduler.metrics() for host, scheduler in schedulers.items()}
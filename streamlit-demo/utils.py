@@ -40,14 +40,3 @@ def get_score_metric(percent, label):
             margin: 0;
         ">{score}</p>
     """, unsafe_allow_html=True)
-
-  
-def get_overall_score(resort):
-    open_trails = float(resort.get("open_trails", '0/0').replace('n/a', '0/0').split("/")[0])
-    total_trails = float(resort.get("open_trails", '0/0').replace('n/a', '0/0').split("/")[1])
-    open_trails_percent = (open_trails / total_trails * 100) if total_trails > 0 else 0
-    open_lifts = float(resort.get("open_lifts", '0/0').replace('n/a', '0/0').split("/")[0])
-    total_lifts = float(resort.get("open_lifts", '0/0').replace('n/a', '0/0').split("/")[1])
-    open_lifts_percent = (open_lifts / total_lifts * 100) if total_lifts > 0 else 0
-    overall_score = (open_trails_percent + open_lifts_percent) / 2
-    return overall_score, get_score(overall_score)
\ No newline at end of file
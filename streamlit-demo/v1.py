@@ -2,9 +2,11 @@ import streamlit as st
 from dropdowns import get_state_dropdown
 from table import get_resort_table 
 from inputs import get_resort_search_bar
-from cards import get_overall_card
+from cards import get_national_card, get_overall_card
 from popovers import get_popover
 from query_params import read_query_params, set_query_params
+from api import get_stale_timestamp, get_remaining_api_budget
+from summaries import ALL_STATES
 
 st.set_page_config(page_title="Snow Data v1", page_icon="❄️")
 
@@ -19,19 +21,28 @@ st.write("## Snow Report:")
 get_state_dropdown()
 
 
-get_overall_card()
-
-api_limit = st.session_state.get("rate_limited", False)
-if st.session_state.get("rate_limited", False):
-  st.error("API rate limit reached. Please try again tomorrow.")
+if st.session_state.get("selected_state") == ALL_STATES:
+  # Rendered from the precomputed state summaries, no state payload is loaded
+  get_national_card()
 else:
-  st.write("## Resorts:")
-
-  col1, col2  = st.columns([4, 1], vertical_alignment="bottom")
-  with col1:
-    get_resort_search_bar()
-  with col2:
-    get_popover()
-
-  get_resort_table()
-
+  get_overall_card()
+
+  stale_since = get_stale_timestamp("get_snow_by_state", {"state": st.session_state.get("selected_state", None)})
+  if stale_since is not None:
+    st.info(f"Showing conditions from {stale_since:%b %d, %I:%M %p} while fresh data loads. Refresh the page in a moment.")
+
+  api_limit = st.session_state.get("rate_limited", False)
+  if st.session_state.get("rate_limited", False):
+    st.error("API rate limit reached. Please try again tomorrow.")
+  else:
+    if get_remaining_api_budget()["low"]:
+      st.warning("Live data requests are almost used up for today, so some states may show older conditions.")
+    st.write("## Resorts:")
+
+    col1, col2  = st.columns([4, 1], vertical_alignment="bottom")
+    with col1:
+      get_resort_search_bar()
+    with col2:
+      get_popover()
+
+    get_resort_table()
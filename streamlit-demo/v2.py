@@ -1,6 +1,9 @@
 import streamlit as st
-from v2_api import fetch_organized_resorts
-from v2_resort_selector import get_location_selector, get_comparison_selector
+from v2_resort_selector import (
+    get_location_selector, get_comparison_selector, get_selected_resort, get_selected_comparison
+)
+from v2_resort_search import get_resort_search
+from v2_nearby_resorts import get_nearby_resorts
 from v2_resort_data import get_resort_data
 
 st.markdown("""
@@ -14,8 +17,12 @@ st.markdown("""
 st.set_page_config(page_title="Snow Data v2", page_icon="❄️")
 
 
+get_resort_search()
+
 get_location_selector()
 
+get_nearby_resorts()
+
 get_comparison_selector()
 
-get_resort_data()
\ No newline at end of file
+get_resort_data(get_selected_resort(), get_selected_comparison())
\ No newline at end of file
@@ -0,0 +1,122 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from v2_constants import (
+    COL_DATE, COL_TEMP_MAX, COL_TEMP_MIN, COL_TEMP_MEAN, COL_PRECIPITATION, COL_SNOWFALL,
+    COL_SNOW_DEPTH, COL_WIND_SPEED_MAX, COL_WIND_GUSTS_MAX, COL_PRESSURE
+)
+
+# days is the nominal bin width, used to count points and pad shading
+Resolution = namedtuple("Resolution", ["name", "freq", "days"])
+
+RESOLUTION_AUTO = "auto"
+RESOLUTIONS = [
+    Resolution("daily", "D", 1),
+    Resolution("weekly", "7D", 7),
+    Resolution("monthly", "MS", 30.44),
+    Resolution("yearly", "YS", 365.25),
+]
+DAILY = RESOLUTIONS[0]
+
+# Auto picks the finest resolution with at most this many bins, the picker never offers one
+# with more than MAX_CHART_POINTS, so a multi-decade range stays a bounded payload
+TARGET_CHART_POINTS = 800
+MAX_CHART_POINTS = 4000
+# Longer line series are thinned with LTTB, and drawn with WebGL above WEBGL_MIN_POINTS
+MAX_LINE_POINTS = 2000
+WEBGL_MIN_POINTS = 1000
+
+# How each daily column combines into a bin: totals add up, extremes stay extremes
+COLUMN_REDUCERS = {
+    COL_TEMP_MAX: "max",
+    COL_TEMP_MIN: "min",
+    COL_TEMP_MEAN: "mean",
+    COL_PRECIPITATION: "sum",
+    COL_SNOWFALL: "sum",
+    COL_SNOW_DEPTH: "max",
+    COL_WIND_SPEED_MAX: "max",
+    COL_WIND_GUSTS_MAX: "max",
+    COL_PRESSURE: "mean",
+}
+
+
+def _bin_count(days, resolution):
+    return int(np.ceil(days / resolution.days))
+
+
+def available_resolutions(start_date, end_date):
+    days = (pd.Timestamp(end_date) - pd.Timestamp(start_date)).days + 1
+    return [resolution for resolution in RESOLUTIONS if _bin_count(days, resolution) <= MAX_CHART_POINTS]
+
+
+def choose_resolution(start_date, end_date, name=RESOLUTION_AUTO):
+    # A named resolution that is still allowed for the range wins, otherwise auto
+    resolutions = available_resolutions(start_date, end_date)
+    for resolution in resolutions:
+        if resolution.name == name:
+            return resolution
+    days = (pd.Timestamp(end_date) - pd.Timestamp(start_date)).days + 1
+    for resolution in resolutions:
+        if _bin_count(days, resolution) <= TARGET_CHART_POINTS:
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+def resample_weather(data, resolution):
+    # Daily weather frame to one row per bin, dated at the bin start
+    if data is None or data.empty or resolution.freq == DAILY.freq:
+        return data
+    bins = data.set_index(COL_DATE).sort_index().resample(resolution.freq, origin="start")
+    columns = [column for column in data.columns if column != COL_DATE]
+    parts = []
+    for reducer in ("sum", "mean", "min", "max"):
+        reduced = [column for column in columns if COLUMN_REDUCERS.get(column, "mean") == reducer]
+        if reduced:
+            # A bin with no values at all stays empty instead of summing to 0
+            parts.append(bins[reduced].sum(min_count=1) if reducer == "sum" else getattr(bins[reduced], reducer)())
+    return pd.concat(parts, axis=1)[columns].reset_index()
+
+
+def lttb_indices(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: keeps the first and last points, and from each bucket
+    # in between the point forming the largest triangle with the previously kept point and
+    # the next bucket's mean, so peaks and troughs survive the thinning
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample_line(x, y, max_points=MAX_LINE_POINTS):
+    x = pd.Series(x).reset_index(drop=True)
+    y = pd.Series(y, dtype=float).reset_index(drop=True)
+    if len(y) <= max_points:
+        return x, y
+    # LTTB needs every point to have a y, missing ones are dropped before thinning
+    present = y.notna().to_numpy()
+    x = x[present]
+    y = y[present]
+    if len(y) <= max_points:
+        return x, y
+    numeric_x = x.to_numpy().astype("datetime64[ns]").astype(np.int64) if pd.api.types.is_datetime64_any_dtype(x) else x.to_numpy()
+    keep = lttb_indices(numeric_x, y.to_numpy(), max_points)
+    return x.iloc[keep], y.iloc[keep]
@@ -1,131 +1,226 @@
+import threading
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor, wait
 import streamlit as st
-import requests
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import http_client
+from single_flight import single_flight
 import pandas as pd
-import os
-import json
+from v2_catalog import get_resort_catalog, get_resort_hierarchy
+from v2_climatology import get_resort_climatology
+from v2_spatial import get_resort_spatial_index
+from v2_weather_store import (
+    DAILY_VARIABLES, location_key, missing_date_ranges, store_daily_weather, load_daily_weather
+)
 from v2_constants import (
-    RESORT_SELECTOR_STATE_KEY, COMPARE_RESORT_SELECTOR_STATE_KEY, COMPARE_COUNTRY_SELECTOR_STATE_KEY,
-    COL_DATE, COL_TEMP_MAX, COL_TEMP_MIN, COL_TEMP_MEAN, COL_PRECIPITATION, COL_SNOWFALL,
-    COL_SNOW_DEPTH, COL_WIND_SPEED_MAX, COL_WIND_GUSTS_MAX, COL_PRESSURE
+    COUNTRY_SELECTOR_STATE_KEY, STATE_SELECTOR_STATE_KEY, RESORT_SELECTOR_STATE_KEY,
+    COL_RESORT, COL_REGION, COL_COUNTRY, COL_DISTANCE
 )
 
-@st.cache_data(ttl=86400)
-def fetch_resorts():
-    base_dir = os.path.dirname(__file__)
-    with open(os.path.join(base_dir, "hardcode_data", "ski_areas.json"), "r") as f:
-        resorts = json.load(f)
-    return resorts
-
-def fetch_organized_resorts():
-    resorts = fetch_resorts()
-    organized = {}
-    for resort in resorts:
-        country = resort.get("countries", "Unknown")
-        countries = country.split(";") if country else ["Unknown"]
-        state = resort.get("regions", "Unknown")
-        states = state.split(";") if state else ["Unknown"]
-        
-        for curr_country in countries:
-          for curr_state in states:
-            if curr_country not in organized:
-                organized[curr_country] = {}
-            if curr_state not in organized[curr_country]:
-                organized[curr_country][curr_state] = []
-            organized[curr_country][curr_state].append(resort)
-    return organized
-
-
-
-@st.cache_data(ttl=3600)
-def fetch_historical_weather(lat, lng, start_date, end_date):
+# Upper bound on concurrent upstream fetches for the whole process, shared by all sessions
+FETCH_MAX_WORKERS = 4
+
+_fetch_executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="v2-fetch")
+_fetch_worker = threading.local()
+
+
+class RateLimitedError(Exception):
+    pass
+
+
+def _run_fetch_in_worker(ctx, fetch):
+    # Attach the session's script run context so st.cache_* and st.session_state work here
+    add_script_run_ctx(threading.current_thread(), ctx)
+    _fetch_worker.active = True
+    try:
+        return fetch()
+    finally:
+        _fetch_worker.active = False
+
+
+def run_fetches_concurrently(*fetches):
+    ctx = get_script_run_ctx()
+    # Without a script run context there is nothing to propagate, and nested calls from a
+    # worker run inline so pool threads never block waiting on each other
+    if ctx is None or len(fetches) < 2 or getattr(_fetch_worker, "active", False):
+        return [fetch() for fetch in fetches]
+
+    futures = [_fetch_executor.submit(_run_fetch_in_worker, ctx, fetch) for fetch in fetches]
+    wait(futures)
+
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    if errors:
+        # A rate limit wins over other failures so callers can tell the user to back off
+        raise next((error for error in errors if isinstance(error, RateLimitedError)), errors[0])
+    return [future.result() for future in futures]
+
+
+def fetch_resort_hierarchy():
+    return get_resort_hierarchy()
+
+
+def _nearby_resorts_frame(rows, distances):
+    catalog = get_resort_catalog()
+    return pd.DataFrame({
+        COL_RESORT: [catalog.name(row) for row in rows],
+        COL_REGION: [catalog.region(row) for row in rows],
+        COL_COUNTRY: [catalog.country(row) for row in rows],
+        COL_DISTANCE: distances,
+    })
+
+
+def fetch_nearest_resorts(lat, lng, limit=10, exclude_resort=None):
+    rows, distances = get_resort_spatial_index().nearest(lat, lng, limit, exclude_row=exclude_resort)
+    return _nearby_resorts_frame(rows, distances)
+
+
+def fetch_resorts_within(lat, lng, radius_miles, exclude_resort=None):
+    rows, distances = get_resort_spatial_index().within(lat, lng, radius_miles)
+    if exclude_resort is not None:
+        keep = rows != exclude_resort
+        rows, distances = rows[keep], distances[keep]
+    return _nearby_resorts_frame(rows, distances)
+
+
+def fetch_nearby_resorts_for_current_resort(radius_miles, limit=10):
+    if RESORT_SELECTOR_STATE_KEY not in st.session_state:
+        return None
+
+    selected_resort = _find_current_resort()
+    if selected_resort is None:
+        return None
+
+    coordinates = get_resort_catalog().coordinates(selected_resort)
+    if coordinates is None:
+        return None
+
+    lat, lng = coordinates
+    return fetch_resorts_within(lat, lng, radius_miles, exclude_resort=selected_resort).head(limit)
+
+
+# Locations per archive request, the API takes comma separated coordinate lists
+ARCHIVE_BATCH_SIZE = 10
+# First day the archive has data for
+ARCHIVE_START_DATE = date(1940, 1, 1)
+# Most days a shared request may fetch for a location beyond the ones it is missing, so
+# batching never re-downloads a long stretch of settled archive
+ARCHIVE_MAX_OVERFETCH_DAYS = 31
+
+
+def fetch_archive_daily(locations, start_date, end_date):
     base_url = "https://archive-api.open-meteo.com/v1/archive"
     
     params = {
-        "latitude": lat,
-        "longitude": lng,
+        "latitude": ",".join(str(lat) for lat, _ in locations),
+        "longitude": ",".join(str(lng) for _, lng in locations),
         "start_date": start_date,
         "end_date": end_date,
-        "daily": [
-            "temperature_2m_max",
-            "temperature_2m_min",
-            "temperature_2m_mean",
-            "precipitation_sum",
-            "snowfall_sum",
-            "snow_depth_max",
-            "wind_speed_10m_max",
-            "wind_gusts_10m_max",
-            "pressure_msl_mean"
-        ],
+        "daily": list(DAILY_VARIABLES.values()),
         "temperature_unit": "fahrenheit", 
         "wind_speed_unit": "mph",
         "precipitation_unit": "inch",
         "timezone": "America/Denver"
     }
     
-    response = requests.get(base_url, params=params)
+    response = http_client.get(base_url, params=params)
+    if response.status_code == 429:
+        raise RateLimitedError("Open-Meteo archive rate limit reached.")
     response.raise_for_status()
     
+    # One location comes back as an object, several as a list in request order
     data = response.json()
-    
-    # Convert to DataFrame
-    df = pd.DataFrame({
-        COL_DATE: pd.to_datetime(data["daily"]["time"]),
-        COL_TEMP_MAX: data["daily"]["temperature_2m_max"],
-        COL_TEMP_MIN: data["daily"]["temperature_2m_min"],
-        COL_TEMP_MEAN: data["daily"]["temperature_2m_mean"],
-        COL_PRECIPITATION: data["daily"]["precipitation_sum"],
-        COL_SNOWFALL: data["daily"]["snowfall_sum"],
-        COL_SNOW_DEPTH: data["daily"]["snow_depth_max"],
-        COL_WIND_SPEED_MAX: data["daily"]["wind_speed_10m_max"],
-        COL_WIND_GUSTS_MAX: data["daily"]["wind_gusts_10m_max"],
-        COL_PRESSURE: data["daily"]["pressure_msl_mean"]
-    })
-    
-    return df
-
+    if isinstance(data, dict):
+        data = [data]
+    return [location_data["daily"] for location_data in data]
+
+
+def _span_days(start, end):
+    return (end - start).days + 1
+
+
+def _plan_archive_requests(gaps):
+    # gaps is [((start, end), location)]. Returns (start, end, locations) requests that
+    # together cover every gap, each fetching at most ARCHIVE_MAX_OVERFETCH_DAYS days more
+    # than any of its gaps needs.
+    requests = []
+    for (gap_start, gap_end), location in sorted(gaps):
+        if requests:
+            start, end, locations, shortest = requests[-1]
+            new_end = max(end, gap_end)
+            fits = (
+                location not in locations and len(locations) < ARCHIVE_BATCH_SIZE
+                and _span_days(start, new_end) - min(shortest, _span_days(gap_start, gap_end)) <= ARCHIVE_MAX_OVERFETCH_DAYS
+            )
+            if fits:
+                requests[-1] = (start, new_end, locations + [location], min(shortest, _span_days(gap_start, gap_end)))
+                continue
+        requests.append((gap_start, gap_end, [location], _span_days(gap_start, gap_end)))
+    return [(start, end, locations) for start, end, locations, _ in requests]
+
+
+def fetch_historical_weather_batch(locations, start_date, end_date):
+    # Only the days missing from the local store go upstream. A location's gaps a few days
+    # apart are fetched as one, and locations missing about the same range share a request.
+    unique_locations = {location_key(lat, lng): (lat, lng) for lat, lng in locations}
+    gaps = []
+    for lat, lng in unique_locations.values():
+        merged = []
+        for gap_start, gap_end in missing_date_ranges(lat, lng, start_date, end_date):
+            if merged and _span_days(merged[-1][1], gap_start) - 2 <= ARCHIVE_MAX_OVERFETCH_DAYS:
+                merged[-1] = (merged[-1][0], gap_end)
+            else:
+                merged.append((gap_start, gap_end))
+        gaps.extend((gap, (lat, lng)) for gap in merged)
+
+    def fetch_chunk(gap_start, gap_end, chunk):
+        def fetch():
+            # Another session or worker may have stored these days while this one waited
+            if not any(missing_date_ranges(lat, lng, gap_start, gap_end) for lat, lng in chunk):
+                return
+            for (lat, lng), daily in zip(chunk, fetch_archive_daily(chunk, gap_start, gap_end)):
+                store_daily_weather(lat, lng, daily)
+
+        key = f"archive:{'|'.join(location_key(lat, lng) for lat, lng in chunk)}:{gap_start}:{gap_end}"
+        return lambda: single_flight(key, fetch, cross_process=True)
+
+    run_fetches_concurrently(*(
+        fetch_chunk(gap_start, gap_end, chunk) for gap_start, gap_end, chunk in _plan_archive_requests(gaps)
+    ))
+
+    return [load_daily_weather(lat, lng, start_date, end_date) for lat, lng in locations]
 
-def fetch_historical_data_for_current_resort(start_date, end_date):
-    if RESORT_SELECTOR_STATE_KEY not in st.session_state:
-        st.error("No resort selected.")
-        return None
 
-    resorts = fetch_resorts()
-    selected_resort_name = st.session_state[RESORT_SELECTOR_STATE_KEY]
-    selected_resort = next((resort for resort in resorts if resort.get("name") == selected_resort_name), None)
-    if not selected_resort:
-        st.error("Selected resort not found.")
-        return None
-    lat = selected_resort.get("lat", None)
-    lng = selected_resort.get("lng", None)
-
-    if lat is None or lng is None:
-        st.error("Resort does not have valid latitude/longitude.")
-        return None
+def fetch_historical_weather(lat, lng, start_date, end_date):
+    return fetch_historical_weather_batch([(lat, lng)], start_date, end_date)[0]
 
-    return fetch_historical_weather(lat, lng, start_date, end_date)
 
+def _find_current_resort():
+    return get_resort_catalog().find(
+        st.session_state[RESORT_SELECTOR_STATE_KEY],
+        st.session_state.get(COUNTRY_SELECTOR_STATE_KEY, None),
+        st.session_state.get(STATE_SELECTOR_STATE_KEY, None),
+    )
 
-def fetch_historical_data_for_comparison_resort(start_date, end_date):
-    compare_country = st.session_state.get(COMPARE_COUNTRY_SELECTOR_STATE_KEY, None)
-    if not compare_country or compare_country == "None":
-        return None
 
-    compare_resort_name = st.session_state.get(COMPARE_RESORT_SELECTOR_STATE_KEY, None)
-    if not compare_resort_name:
+def get_resort_coordinates(selection):
+    # (country, state, resort) as the selectors hand it out, to (lat, lng) or None
+    if selection is None or not selection[2]:
         return None
-
-    resorts = fetch_resorts()
-    compare_resort = next((resort for resort in resorts if resort.get("name") == compare_resort_name), None)
-    if not compare_resort:
+    country, state, resort = selection
+    catalog = get_resort_catalog()
+    row = catalog.find(resort, country, state)
+    if row is None:
         return None
+    return catalog.coordinates(row)
 
-    lat = compare_resort.get("lat", None)
-    lng = compare_resort.get("lng", None)
 
-    if lat is None or lng is None:
-        return None
+def fetch_historical_data_for_resorts(coordinates, compare_coordinates, start_date, end_date):
+    # Primary and comparison resort (if there is one) come back from one batched request
+    if compare_coordinates is None:
+        return fetch_historical_weather_batch([coordinates], start_date, end_date)[0], None
 
-    return fetch_historical_weather(lat, lng, start_date, end_date)
+    data, compare_data = fetch_historical_weather_batch([coordinates, compare_coordinates], start_date, end_date)
+    return data, compare_data
 
 
 def get_season_dates():
@@ -173,22 +268,8 @@ def get_season_dates():
     }
 
 
-def fetch_last_season_data_for_current_resort():
-    if RESORT_SELECTOR_STATE_KEY not in st.session_state:
-        return None
-
-    resorts = fetch_resorts()
-    selected_resort_name = st.session_state[RESORT_SELECTOR_STATE_KEY]
-    selected_resort = next((resort for resort in resorts if resort.get("name") == selected_resort_name), None)
-    if not selected_resort:
-        return None
-
-    lat = selected_resort.get("lat", None)
-    lng = selected_resort.get("lng", None)
-
-    if lat is None or lng is None:
-        return None
-
+def fetch_last_season_data(coordinates):
+    lat, lng = coordinates
     season_dates = get_season_dates()
     return fetch_historical_weather(
         lat, lng,
@@ -197,25 +278,22 @@ def fetch_last_season_data_for_current_resort():
     )
 
 
-def fetch_this_season_data_for_current_resort():
-    if RESORT_SELECTOR_STATE_KEY not in st.session_state:
-        return None
-
-    resorts = fetch_resorts()
-    selected_resort_name = st.session_state[RESORT_SELECTOR_STATE_KEY]
-    selected_resort = next((resort for resort in resorts if resort.get("name") == selected_resort_name), None)
-    if not selected_resort:
-        return None
-
-    lat = selected_resort.get("lat", None)
-    lng = selected_resort.get("lng", None)
-
-    if lat is None or lng is None:
-        return None
-
+def fetch_this_season_data(coordinates):
+    lat, lng = coordinates
     season_dates = get_season_dates()
     return fetch_historical_weather(
         lat, lng,
         season_dates['this_season_start'],
         season_dates['this_season_end']
-    )
\ No newline at end of file
+    )
+
+
+def fetch_climatology(coordinates):
+    lat, lng = coordinates
+    season_dates = get_season_dates()
+    return get_resort_climatology(
+        location_key(lat, lng),
+        ARCHIVE_START_DATE,
+        season_dates['this_season_end'],
+        lambda start_date, end_date: fetch_historical_weather(lat, lng, start_date, end_date),
+    )
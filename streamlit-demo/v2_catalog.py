@@ -0,0 +1,298 @@
+import hashlib
+import json
+import os
+from types import MappingProxyType
+
+import numpy as np
+import streamlit as st
+
+CATALOG_SOURCE_PATH = os.path.join(os.path.dirname(__file__), "hardcode_data", "ski_areas.json")
+CATALOG_ARTIFACT_PATH = os.path.join(os.path.dirname(__file__), "hardcode_data", "ski_areas.catalog")
+
+# Artifact layout: magic, 8 byte header length, JSON header, then 64 byte aligned column blocks
+CATALOG_ARTIFACT_MAGIC = b"SKICAT1\n"
+CATALOG_ARTIFACT_ALIGNMENT = 64
+CATALOG_COLUMNS = ("names", "countries", "regions", "websites", "lat", "lng")
+
+UNKNOWN_LOCATION = "Unknown"
+
+
+def split_locations(value):
+    # Resorts on a border list several countries/regions separated by ";"
+    return value.split(";") if value else [UNKNOWN_LOCATION]
+
+
+class ResortCatalog:
+    # Immutable, column oriented view of ski_areas.json. String columns are
+    # int32 codes into one interned string table, coordinates are float arrays.
+    __slots__ = (
+        "version", "strings", "names", "countries", "regions", "websites", "lat", "lng",
+        "_by_name", "_by_location",
+    )
+
+    def __init__(self, strings, names, countries, regions, websites, lat, lng, version=None):
+        set_attr = super().__setattr__
+        set_attr("version", version)
+        set_attr("strings", tuple(strings))
+        for column_name, column in (
+            ("names", names), ("countries", countries), ("regions", regions), ("websites", websites),
+            ("lat", lat), ("lng", lng),
+        ):
+            column = np.asarray(column)
+            if column.flags.writeable:
+                column.flags.writeable = False
+            set_attr(column_name, column)
+
+        by_name = {}
+        by_location = {}
+        for row, (name_code, country_code, region_code) in enumerate(
+            zip(self.names.tolist(), self.countries.tolist(), self.regions.tolist())
+        ):
+            name = self.strings[name_code]
+            if not name:
+                continue
+            # First entry wins, matching the old linear scan
+            by_name.setdefault(name, row)
+            for country in split_locations(self.strings[country_code]):
+                for region in split_locations(self.strings[region_code]):
+                    by_location.setdefault((country, region, name), row)
+        set_attr("_by_name", MappingProxyType(by_name))
+        set_attr("_by_location", MappingProxyType(by_location))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ResortCatalog is immutable")
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_records(cls, records, version=None):
+        interned = {}
+
+        def intern(value):
+            value = value or ""
+            code = interned.get(value)
+            if code is None:
+                code = interned[value] = len(interned)
+            return code
+
+        names = np.fromiter((intern(r.get("name")) for r in records), dtype=np.int32, count=len(records))
+        countries = np.fromiter((intern(r.get("countries")) for r in records), dtype=np.int32, count=len(records))
+        regions = np.fromiter((intern(r.get("regions")) for r in records), dtype=np.int32, count=len(records))
+        websites = np.fromiter((intern(r.get("websites")) for r in records), dtype=np.int32, count=len(records))
+        lat = np.array([_to_float(r.get("lat")) for r in records], dtype=np.float64)
+        lng = np.array([_to_float(r.get("lng")) for r in records], dtype=np.float64)
+        return cls(interned.keys(), names, countries, regions, websites, lat, lng, version=version)
+
+    def find(self, name, country=None, region=None):
+        if country is not None and region is not None:
+            row = self._by_location.get((country, region, name))
+            if row is not None:
+                return row
+        return self._by_name.get(name)
+
+    def name(self, row):
+        return self.strings[self.names[row]]
+
+    def country(self, row):
+        return self.strings[self.countries[row]]
+
+    def region(self, row):
+        return self.strings[self.regions[row]]
+
+    def coordinates(self, row):
+        lat = float(self.lat[row])
+        lng = float(self.lng[row])
+        if np.isnan(lat) or np.isnan(lng):
+            return None
+        return lat, lng
+
+    def record(self, row):
+        return {
+            "name": self.name(row),
+            "countries": self.country(row),
+            "regions": self.region(row),
+            "websites": self.strings[self.websites[row]],
+            "lat": float(self.lat[row]),
+            "lng": float(self.lng[row]),
+        }
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class ResortHierarchy:
+    # Country -> region -> resorts, with every selector's options sorted up front
+    __slots__ = ("countries", "_regions", "_resort_names", "_resorts")
+
+    def __init__(self, catalog):
+        organized = {}
+        for row in range(len(catalog)):
+            for country in split_locations(catalog.country(row)):
+                for region in split_locations(catalog.region(row)):
+                    organized.setdefault(country, {}).setdefault(region, []).append(row)
+
+        set_attr = super().__setattr__
+        set_attr("countries", tuple(sorted(organized)))
+        set_attr("_regions", MappingProxyType({
+            country: tuple(sorted(regions)) for country, regions in organized.items()
+        }))
+        set_attr("_resorts", MappingProxyType({
+            (country, region): tuple(rows)
+            for country, regions in organized.items()
+            for region, rows in regions.items()
+        }))
+        set_attr("_resort_names", MappingProxyType({
+            location: tuple(sorted(name for name in (catalog.name(row) for row in rows) if name != ""))
+            for location, rows in self._resorts.items()
+        }))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ResortHierarchy is immutable")
+
+    def regions(self, country):
+        return self._regions.get(country, ())
+
+    def resort_names(self, country, region):
+        return self._resort_names.get((country, region), ())
+
+    def resorts(self, country, region):
+        return self._resorts.get((country, region), ())
+
+
+def load_catalog_from_json(path=CATALOG_SOURCE_PATH):
+    with open(path, "rb") as f:
+        raw = f.read()
+    return ResortCatalog.from_records(json.loads(raw), version=hashlib.sha256(raw).hexdigest())
+
+
+def compile_catalog(source_path=CATALOG_SOURCE_PATH, artifact_path=CATALOG_ARTIFACT_PATH):
+    # Taken before reading, so a source changed mid-compile never looks unchanged later
+    source_size, source_mtime_ns = _source_stat(source_path)
+    catalog = load_catalog_from_json(source_path)
+
+    encoded = [value.encode("utf-8") for value in catalog.strings]
+    string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    string_offsets[1:] = np.cumsum([len(value) for value in encoded])
+    blocks = {
+        "string_offsets": string_offsets,
+        "string_data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+    }
+    for column_name in CATALOG_COLUMNS:
+        blocks[column_name] = np.ascontiguousarray(getattr(catalog, column_name))
+
+    columns = {}
+    offset = 0
+    for block_name, block in blocks.items():
+        columns[block_name] = {"dtype": block.dtype.str, "offset": offset, "length": len(block)}
+        offset += -(-block.nbytes // CATALOG_ARTIFACT_ALIGNMENT) * CATALOG_ARTIFACT_ALIGNMENT
+
+    header = json.dumps({
+        "source_version": catalog.version, "source_size": source_size, "source_mtime_ns": source_mtime_ns,
+        "count": len(catalog), "columns": columns,
+    }).encode("utf-8")
+    data_start = len(CATALOG_ARTIFACT_MAGIC) + 8 + len(header)
+    data_start += -data_start % CATALOG_ARTIFACT_ALIGNMENT
+
+    # Write next to the target and swap it in so running workers never map a half written file
+    tmp_path = f"{artifact_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(CATALOG_ARTIFACT_MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for block_name, block in blocks.items():
+            f.seek(data_start + columns[block_name]["offset"])
+            f.write(block.tobytes())
+    os.replace(tmp_path, artifact_path)
+    return catalog
+
+
+def _read_artifact_header(artifact_path):
+    with open(artifact_path, "rb") as f:
+        if f.read(len(CATALOG_ARTIFACT_MAGIC)) != CATALOG_ARTIFACT_MAGIC:
+            raise ValueError(f"{artifact_path} is not a compiled resort catalog")
+        header_length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_length))
+    data_start = len(CATALOG_ARTIFACT_MAGIC) + 8 + header_length
+    data_start += -data_start % CATALOG_ARTIFACT_ALIGNMENT
+    return header, data_start
+
+
+def load_catalog_from_artifact(artifact_path=CATALOG_ARTIFACT_PATH):
+    header, data_start = _read_artifact_header(artifact_path)
+
+    # One read-only mapping of the whole file. Only the code and coordinate columns stay on the
+    # shared pages: each process still decodes the string table and builds the lookup dicts in
+    # ResortCatalog (about 6 ms for the full catalog), which are its own memory.
+    mapped = np.memmap(artifact_path, dtype=np.uint8, mode="r")
+
+    def column(block_name):
+        spec = header["columns"][block_name]
+        dtype = np.dtype(spec["dtype"])
+        start = data_start + spec["offset"]
+        return mapped[start:start + spec["length"] * dtype.itemsize].view(dtype)
+
+    string_offsets = column("string_offsets").tolist()
+    string_data = column("string_data").tobytes()
+    strings = [
+        string_data[start:end].decode("utf-8")
+        for start, end in zip(string_offsets[:-1], string_offsets[1:])
+    ]
+    return ResortCatalog(
+        strings, *(column(column_name) for column_name in CATALOG_COLUMNS),
+        version=header["source_version"],
+    )
+
+
+def load_catalog(source_path=CATALOG_SOURCE_PATH, artifact_path=CATALOG_ARTIFACT_PATH):
+    if os.path.exists(artifact_path):
+        try:
+            header, _ = _read_artifact_header(artifact_path)
+            if not os.path.exists(source_path) or _artifact_matches_source(header, source_path):
+                return load_catalog_from_artifact(artifact_path)
+            print("Compiled resort catalog is stale, loading JSON source")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not load compiled resort catalog: {e}")
+    return load_catalog_from_json(source_path)
+
+
+def _source_version(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _source_stat(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _artifact_matches_source(header, source_path):
+    # Size and mtime recorded at compile time settle it without reading the source, the
+    # content hash is only computed when they differ (e.g. after a copy touched the mtime)
+    if (header.get("source_size"), header.get("source_mtime_ns")) == _source_stat(source_path):
+        return True
+    return header["source_version"] == _source_version(source_path)
+
+
+@st.cache_resource
+def get_resort_catalog():
+    # cache_resource hands every session the same object instead of unpickling a copy
+    return load_catalog()
+
+
+@st.cache_resource
+def _build_resort_hierarchy(catalog_version):
+    return ResortHierarchy(get_resort_catalog())
+
+
+def get_resort_hierarchy():
+    return _build_resort_hierarchy(get_resort_catalog().version)
+
+
+if __name__ == "__main__":
+    compiled = compile_catalog()
+    print(f"Compiled {len(compiled)} resorts into {CATALOG_ARTIFACT_PATH}")
@@ -0,0 +1,158 @@
+import threading
+import warnings
+from collections import OrderedDict, namedtuple
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from v2_constants import COL_DATE, COL_DAY_OF_SEASON, COL_SNOWFALL, COL_SNOW_DEPTH, COL_TEMP_MEAN
+from v2_weather_store import WEATHER_SETTLE_DAYS
+
+# Seasons run Oct 1 - Apr 30, days are counted from Oct 1 like the season comparison charts
+SEASON_START_MONTH = 10
+SEASON_END_MONTH = 4
+SEASON_DAYS = 213
+
+COL_CUMULATIVE_SNOWFALL = "Cumulative Snowfall"
+CLIMATOLOGY_METRICS = [COL_CUMULATIVE_SNOWFALL, COL_SNOW_DEPTH, COL_TEMP_MEAN]
+# Daily columns stored in the matrix, cumulative snowfall is derived from snowfall
+MATRIX_COLUMNS = [COL_SNOWFALL, COL_SNOW_DEPTH, COL_TEMP_MEAN]
+
+PERCENTILES = [10, 25, 50, 75, 90]
+COL_P10, COL_P25, COL_MEDIAN, COL_P75, COL_P90 = "P10", "P25", "Median", "P75", "P90"
+PERCENTILE_COLUMNS = [COL_P10, COL_P25, COL_MEDIAN, COL_P75, COL_P90]
+COL_CURRENT = "Current"
+
+# Resorts whose matrices are kept in memory, least recently used dropped first
+CLIMATOLOGY_CACHE_RESORTS = 64
+
+# frames maps each metric to one row per day of season: the percentile bands over the
+# reference seasons and the current season's values
+ResortClimatology = namedtuple("ResortClimatology", ["first_season", "last_season", "current_season", "frames"])
+
+
+def season_of(day):
+    day = pd.Timestamp(day)
+    return day.year if day.month >= SEASON_START_MONTH else day.year - 1
+
+
+def _season_end(season):
+    return date(season + 1, SEASON_END_MONTH, 30)
+
+
+class SeasonMatrix:
+    # One row per season since first_season and one column per day of season, for each
+    # stored column. Rows are only appended, new days are written in place, and the bands
+    # are only recomputed when another season becomes part of the reference.
+    def __init__(self, first_season):
+        self.first_season = first_season
+        self.values = {column: np.full((0, SEASON_DAYS), np.nan) for column in MATRIX_COLUMNS}
+        # Days up to here are final upstream and never loaded again
+        self.settled_through = None
+        self.lock = threading.Lock()
+        self._bands = {}
+        self._band_seasons = None
+
+    def add_days(self, daily):
+        if daily is None or daily.empty:
+            return
+        dates = daily[COL_DATE]
+        in_season = ((dates.dt.month >= SEASON_START_MONTH) | (dates.dt.month <= SEASON_END_MONTH)).to_numpy()
+        dates = dates[in_season]
+        seasons = np.where(dates.dt.month >= SEASON_START_MONTH, dates.dt.year, dates.dt.year - 1)
+        season_starts = pd.to_datetime(pd.DataFrame({"year": seasons, "month": SEASON_START_MONTH, "day": 1}))
+        rows = seasons - self.first_season
+        columns = (dates.to_numpy() - season_starts.to_numpy()).astype("timedelta64[D]").astype(np.int64)
+        keep = rows >= 0
+        rows, columns = rows[keep], columns[keep]
+        if not len(rows):
+            return
+
+        missing_rows = rows.max() + 1 - len(self.values[MATRIX_COLUMNS[0]])
+        for column in MATRIX_COLUMNS:
+            if missing_rows > 0:
+                self.values[column] = np.vstack((self.values[column], np.full((missing_rows, SEASON_DAYS), np.nan)))
+            self.values[column][rows, columns] = daily[column].to_numpy()[in_season][keep]
+
+    def _cumulative_snowfall(self, rows):
+        snowfall = self.values[COL_SNOWFALL][rows]
+        cumulative = np.nancumsum(snowfall, axis=1)
+        # Days after the last reported one stay empty instead of repeating the total
+        reported = np.maximum.accumulate(~np.isnan(snowfall)[:, ::-1], axis=1)[:, ::-1]
+        return np.where(reported, cumulative, np.nan)
+
+    def _metric(self, metric, rows):
+        if metric == COL_CUMULATIVE_SNOWFALL:
+            return self._cumulative_snowfall(rows)
+        return self.values[metric][rows]
+
+    def bands(self, reference_seasons):
+        # Percentiles over the reference seasons for every day of season at once
+        if reference_seasons != self._band_seasons:
+            rows = slice(0, reference_seasons)
+            for metric in CLIMATOLOGY_METRICS:
+                values = self._metric(metric, rows)
+                with warnings.catch_warnings():
+                    # Days no reference season has a value for stay empty
+                    warnings.simplefilter("ignore", RuntimeWarning)
+                    self._bands[metric] = (
+                        np.nanpercentile(values, PERCENTILES, axis=0) if len(values)
+                        else np.full((len(PERCENTILES), SEASON_DAYS), np.nan)
+                    )
+            self._band_seasons = reference_seasons
+        return self._bands
+
+    def current(self, season):
+        row = season - self.first_season
+        if row < 0 or row >= len(self.values[MATRIX_COLUMNS[0]]):
+            return {metric: np.full(SEASON_DAYS, np.nan) for metric in CLIMATOLOGY_METRICS}
+        return {metric: self._metric(metric, slice(row, row + 1))[0] for metric in CLIMATOLOGY_METRICS}
+
+
+_matrices = OrderedDict()
+_matrices_lock = threading.Lock()
+
+
+def _get_matrix(key, first_season):
+    with _matrices_lock:
+        matrix = _matrices.get(key)
+        if matrix is None:
+            matrix = _matrices[key] = SeasonMatrix(first_season)
+        _matrices.move_to_end(key)
+        while len(_matrices) > CLIMATOLOGY_CACHE_RESORTS:
+            _matrices.popitem(last=False)
+        return matrix
+
+
+def get_resort_climatology(key, archive_start, through, load_days):
+    # load_days(start, end) returns the daily frame for a date range, fetching what is
+    # missing. The first call for a resort loads every season the archive fully covers,
+    # later ones only the days after the last settled one.
+    first_season = archive_start.year if archive_start <= date(archive_start.year, SEASON_START_MONTH, 1) else archive_start.year + 1
+    current_season = season_of(through)
+    matrix = _get_matrix(key, first_season)
+
+    with matrix.lock:
+        start = (
+            date(first_season, SEASON_START_MONTH, 1) if matrix.settled_through is None
+            else matrix.settled_through + timedelta(days=1)
+        )
+        if start <= through:
+            matrix.add_days(load_days(start, through))
+            settled = min(through, date.today() - timedelta(days=WEATHER_SETTLE_DAYS))
+            matrix.settled_through = max(settled, start - timedelta(days=1))
+
+        # Every finished season before the one being shown is a reference season
+        reference_seasons = current_season - first_season
+        while reference_seasons > 0 and _season_end(first_season + reference_seasons - 1) > matrix.settled_through:
+            reference_seasons -= 1
+        bands = matrix.bands(reference_seasons)
+        current = matrix.current(current_season)
+
+    frames = {}
+    for metric in CLIMATOLOGY_METRICS:
+        frame = pd.DataFrame(bands[metric].T, columns=PERCENTILE_COLUMNS)
+        frame.insert(0, COL_DAY_OF_SEASON, np.arange(SEASON_DAYS))
+        frame[COL_CURRENT] = current[metric]
+        frames[metric] = frame
+    return ResortClimatology(first_season, first_season + reference_seasons - 1, current_season, frames)
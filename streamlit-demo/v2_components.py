@@ -1,15 +1,26 @@
 import streamlit as st
 from datetime import date, timedelta
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+def rerun_app_when_changed(state_key, value):
+    # Called at the end of a fragment with what it feeds to the rest of the page. When a
+    # fragment-only rerun changed it, the sections outside the fragment are redrawn too.
+    previous = st.session_state.get(state_key)
+    st.session_state[state_key] = value
+    ctx = get_script_run_ctx()
+    if previous is not None and previous != value and ctx is not None and ctx.fragment_ids_this_run:
+        st.rerun(scope="app")
+
 
 def selectbox_with_query_params(label, options, state_key):
-    query_param_value = None
     query_params = st.query_params
-    if state_key in query_params:
-        query_param_value = query_params[state_key].title()
 
+    # Values are stored lowercased in the URL, so match them back case-insensitively
     index = 0
-    if query_param_value and query_param_value in options:
-        index = options.index(query_param_value)
+    if state_key in query_params:
+        lowered = [str(option).lower() for option in options]
+        if query_params[state_key].lower() in lowered:
+            index = lowered.index(query_params[state_key].lower())
 
     def on_selectbox_change():
         if state_key in st.session_state:
@@ -25,6 +36,20 @@ def selectbox_with_query_params(label, options, state_key):
     )
 
 
+def toggle_with_query_params(label, state_key, help=None):
+    # Only an enabled toggle is kept in the URL
+    if state_key not in st.session_state and state_key in st.query_params:
+        st.session_state[state_key] = st.query_params[state_key].lower() == "true"
+
+    def on_toggle_change():
+        if st.session_state[state_key]:
+            st.query_params.update({state_key: "true"})
+        else:
+            st.query_params.pop(state_key, None)
+
+    return st.toggle(label, key=state_key, help=help, on_change=on_toggle_change)
+
+
 def date_range_with_query_params(label, state_key, min_value=None, max_value=None):
     query_param_value = None
     query_params = st.query_params
@@ -41,6 +66,14 @@ def date_range_with_query_params(label, state_key, min_value=None, max_value=Non
         except Exception:
             pass
 
+    # Keep a shared or stale URL inside the picker's bounds
+    if min_value is not None:
+        start_date = max(start_date, min_value)
+        end_date = max(end_date, min_value)
+    if max_value is not None:
+        start_date = min(start_date, max_value)
+        end_date = min(end_date, max_value)
+
     # Initialize session state if it doesn't exist
     if state_key not in st.session_state:
         st.session_state[state_key] = (start_date, end_date)
@@ -108,11 +141,4 @@ def date_range_with_query_params(label, state_key, min_value=None, max_value=Non
           on_change=lambda: st.query_params.update({state_key: f"{st.session_state[state_key][0].isoformat()}_to_{st.session_state[state_key][1].isoformat()}"}),
       )
 
-    if isinstance(selected_date_range, tuple) and len(selected_date_range) == 2:
-        start, end = selected_date_range
-        if (end - start).days > 365:
-            end = start + timedelta(days=365)
-            selected_date_range = (start, end)
-            st.warning("Date range was capped to 1 year from the start date.")
-
     return selected_date_range
\ No newline at end of file
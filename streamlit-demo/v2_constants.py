@@ -3,6 +3,7 @@ COUNTRY_SELECTOR_STATE_KEY = "v2_selected_country"
 STATE_SELECTOR_STATE_KEY = "v2_selected_state"
 RESORT_SELECTOR_STATE_KEY = "v2_selected_resort"
 DATE_RANGE_STATE_KEY = "v2_historical_date_range"
+CHART_RESOLUTION_STATE_KEY = "v2_chart_resolution"
 
 # Comparison resort selector state keys
 COMPARE_COUNTRY_SELECTOR_STATE_KEY = "v2_compare_country"
@@ -11,6 +12,10 @@ COMPARE_RESORT_SELECTOR_STATE_KEY = "v2_compare_resort"
 
 # Season comparison state key
 COMPARE_SEASONS_STATE_KEY = "v2_compare_seasons"
+CLIMATOLOGY_STATE_KEY = "v2_climatology"
+
+# Nearby resorts panel state key
+NEARBY_RADIUS_STATE_KEY = "v2_nearby_radius"
 
 
 # Dataframe column names for historical weather data
@@ -23,4 +28,19 @@ COL_SNOWFALL = "Snowfall"
 COL_SNOW_DEPTH = "Snow Depth"
 COL_WIND_SPEED_MAX = "Wind Speed Max"
 COL_WIND_GUSTS_MAX = "Wind Gusts Max"
-COL_PRESSURE = "Pressure"
\ No newline at end of file
+COL_PRESSURE = "Pressure"
+# Days since the season's Oct 1, used to line seasons up
+COL_DAY_OF_SEASON = "Day of Season"
+
+# Dataframe column names for nearby resort results
+COL_RESORT = "Resort"
+COL_REGION = "State"
+COL_COUNTRY = "Country"
+COL_DISTANCE = "Distance (mi)"
+
+# Global resort search box state key
+RESORT_SEARCH_STATE_KEY = "v2_resort_search"
+
+# What the selector bar and compare panel fragments last handed to the rest of the page
+SELECTION_OUTPUT_STATE_KEY = "v2_selection_output"
+COMPARISON_OUTPUT_STATE_KEY = "v2_comparison_output"
@@ -0,0 +1,54 @@
+import hashlib
+
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+from v2_aggregation import MAX_LINE_POINTS, WEBGL_MIN_POINTS, downsample_line
+
+# Built figures kept across reruns and sessions
+FIGURE_CACHE_ENTRIES = 256
+
+
+def frame_version(*frames):
+    # Content hash of the frames a chart is drawn from, None included so a dropped
+    # comparison changes the key
+    digest = hashlib.blake2b(digest_size=16)
+    for frame in frames:
+        if frame is None:
+            digest.update(b"none")
+            continue
+        digest.update(repr([(str(column), str(dtype)) for column, dtype in frame.dtypes.items()]).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def _build_figure(builder, data_version, options, _build, _frames):
+    return _build(*_frames, **dict(options))
+
+
+def cached_figure(build, *frames, **options):
+    # Unchanged frames and options hand back the figure built last time. It is shared, so
+    # callers only pass it to st.plotly_chart (which copies it) and never mutate it.
+    return _build_figure(
+        f"{build.__module__}.{build.__qualname__}", frame_version(*frames), tuple(sorted(options.items())), build, frames,
+    )
+
+
+def period_shapes(periods, fillcolor, padding=pd.Timedelta(0)):
+    # Full-height shading for each (start, end) period, set as one layout.shapes list
+    # instead of one add_vrect per period
+    return [
+        dict(
+            type="rect", xref="x", yref="y domain", x0=start - padding, x1=end + padding, y0=0, y1=1,
+            fillcolor=fillcolor, layer="below", line_width=0,
+        )
+        for start, end in periods
+    ]
+
+
+def line_trace(x, y, max_points=MAX_LINE_POINTS, **kwargs):
+    # Scatter for a line series, thinned past max_points and drawn with WebGL when long
+    x, y = downsample_line(x, y, max_points)
+    trace = go.Scattergl if len(y) > WEBGL_MIN_POINTS else go.Scatter
+    return trace(x=x, y=y, **kwargs)
@@ -0,0 +1,35 @@
+import streamlit as st
+from v2_api import fetch_nearby_resorts_for_current_resort
+from v2_constants import RESORT_SELECTOR_STATE_KEY, NEARBY_RADIUS_STATE_KEY, COL_DISTANCE
+
+NEARBY_RADIUS_OPTIONS = [25, 50, 100, 200]
+NEARBY_RESORT_LIMIT = 10
+
+
+@st.fragment
+def get_nearby_resorts():
+    selected_resort = st.session_state.get(RESORT_SELECTOR_STATE_KEY, None)
+    if not selected_resort:
+        return
+
+    with st.expander(f"Resorts near {selected_resort}"):
+        radius = st.select_slider(
+            "Radius (miles)",
+            options=NEARBY_RADIUS_OPTIONS,
+            value=50,
+            key=NEARBY_RADIUS_STATE_KEY,
+        )
+
+        nearby = fetch_nearby_resorts_for_current_resort(radius, limit=NEARBY_RESORT_LIMIT)
+        if nearby is None:
+            return
+
+        if nearby.empty:
+            st.caption(f"No other resorts within {radius} miles.")
+            return
+
+        st.dataframe(
+            nearby,
+            hide_index=True,
+            column_config={COL_DISTANCE: st.column_config.NumberColumn(format="%.1f")},
+        )
@@ -1,24 +1,28 @@
+from datetime import date
+
 import streamlit as st
+from v2_aggregation import (
+    available_resolutions, choose_resolution, resample_weather, DAILY, RESOLUTION_AUTO
+)
 from v2_api import (
-    fetch_historical_data_for_current_resort, fetch_historical_data_for_comparison_resort,
-    fetch_this_season_data_for_current_resort, fetch_last_season_data_for_current_resort,
-    get_season_dates
+    fetch_historical_data_for_resorts, fetch_this_season_data, fetch_last_season_data,
+    get_resort_coordinates, get_season_dates, run_fetches_concurrently, fetch_climatology,
+    RateLimitedError, ARCHIVE_START_DATE
+)
+from v2_climatology import (
+    COL_CUMULATIVE_SNOWFALL, COL_CURRENT, COL_MEDIAN, COL_P10, COL_P25, COL_P75, COL_P90
 )
-from v2_components import date_range_with_query_params
+from v2_components import date_range_with_query_params, selectbox_with_query_params, toggle_with_query_params
 from v2_constants import (
-    COL_PRECIPITATION, COL_PRESSURE, COL_SNOWFALL, RESORT_SELECTOR_STATE_KEY,
-    DATE_RANGE_STATE_KEY, STATE_SELECTOR_STATE_KEY, COL_DATE, COL_TEMP_MAX,
-    COL_TEMP_MIN, COL_TEMP_MEAN, COL_WIND_SPEED_MAX, COL_WIND_GUSTS_MAX,
-    COMPARE_RESORT_SELECTOR_STATE_KEY, COMPARE_STATE_SELECTOR_STATE_KEY,
-    COMPARE_COUNTRY_SELECTOR_STATE_KEY, COMPARE_SEASONS_STATE_KEY
+    COL_PRECIPITATION, COL_PRESSURE, COL_SNOWFALL, DATE_RANGE_STATE_KEY, COL_DATE,
+    COL_TEMP_MAX, COL_TEMP_MIN, COL_TEMP_MEAN, COL_WIND_SPEED_MAX, COL_WIND_GUSTS_MAX,
+    CHART_RESOLUTION_STATE_KEY, COL_DAY_OF_SEASON, COL_SNOW_DEPTH, CLIMATOLOGY_STATE_KEY
 )
-from v2_utils import format_date
+from v2_figures import cached_figure, line_trace, period_shapes
+from v2_utils import find_runs, format_date
 import plotly.graph_objects as go
 import pandas as pd
 
-# Column for day of season (used in season comparisons)
-COL_DAY_OF_SEASON = "Day of Season"
-
 # Colors for primary and comparison resorts
 PRIMARY_COLOR = '#1f77b4'
 PRIMARY_COLOR_ALT = '#2ca02c'
@@ -27,26 +31,52 @@ COMPARE_COLOR = '#ff7f0e'
 COMPARE_COLOR_ALT = '#9467bd'
 COMPARE_COLOR_THIRD = '#e377c2'
 
-def get_resort_data():
-    selected_resort = st.session_state.get(RESORT_SELECTOR_STATE_KEY, "N/A")
-    selected_state = st.session_state.get(STATE_SELECTOR_STATE_KEY, "N/A")
+# Custom comparison metrics drawn as bars (rest will be lines)
+BAR_METRICS = [COL_SNOWFALL, COL_PRECIPITATION]
+
+@st.fragment
+def get_resort_data(selection, comparison):
+    # Chart grid. Inputs are the selector bar's and compare panel's outputs, the date range
+    # widget inside only reruns this section. Resorts are resolved from these arguments, not
+    # from session state, so a fragment rerun draws exactly what it was called with.
+    _, selected_state, selected_resort = selection
+    compare_seasons, compare_selection = comparison
 
-    # Check if season comparison is enabled
-    compare_seasons = st.session_state.get(COMPARE_SEASONS_STATE_KEY, False)
+    coordinates = get_resort_coordinates(selection)
+    if coordinates is None:
+        st.error("Selected resort not found." if selected_resort else "No resort selected.")
+        return
 
     if compare_seasons:
         # Season comparison mode
-        get_season_comparison_data(selected_resort, selected_state)
+        get_season_comparison_data(selected_resort, selected_state or "N/A", coordinates)
     else:
         # Normal mode with optional resort comparison
-        get_normal_resort_data(selected_resort, selected_state)
+        get_normal_resort_data(
+            selected_resort, selected_state or "N/A", coordinates,
+            compare_selection, get_resort_coordinates(compare_selection),
+        )
 
 
-def get_season_comparison_data(selected_resort, selected_state):
+def get_season_comparison_data(selected_resort, selected_state, coordinates):
     season_dates = get_season_dates()
 
-    this_season_data = fetch_this_season_data_for_current_resort()
-    last_season_data = fetch_last_season_data_for_current_resort()
+    if toggle_with_query_params(
+        f"Compare with every season since {ARCHIVE_START_DATE.year} (climatology)",
+        state_key=CLIMATOLOGY_STATE_KEY,
+        help="This season against the median and percentile bands of all past seasons",
+    ):
+        get_season_climatology(selected_resort, season_dates, coordinates)
+        return
+
+    try:
+        this_season_data, last_season_data = run_fetches_concurrently(
+            lambda: fetch_this_season_data(coordinates),
+            lambda: fetch_last_season_data(coordinates),
+        )
+    except RateLimitedError:
+        st.error("Weather API rate limit reached. Please try again later.")
+        return
 
     if this_season_data is None:
         st.error("Error fetching this season's data.")
@@ -92,32 +122,159 @@ def get_season_comparison_data(selected_resort, selected_state):
         get_season_wind(this_season_data, last_season_data, this_season_label, last_season_label)
 
 
+def get_season_climatology(selected_resort, season_dates, coordinates):
+    try:
+        climatology = fetch_climatology(coordinates)
+    except RateLimitedError:
+        st.error("Weather API rate limit reached. Please try again later.")
+        return
 
-def get_normal_resort_data(selected_resort, selected_state):
-    date_range = date_range_with_query_params(
-        "Select date range for historical weather data",
-        state_key=DATE_RANGE_STATE_KEY)
+    if climatology is None:
+        st.error("Error fetching climatology data.")
+        return
+
+    this_season_label = f"{climatology.current_season}-{climatology.current_season + 1}"
+    st.write(f"### {selected_resort}: This Season vs Climatology")
+
+    if climatology.last_season < climatology.first_season:
+        st.warning("No complete past seasons are available for this resort yet.")
+        return
+
+    season_count = climatology.last_season - climatology.first_season + 1
+    st.write(f"##### {this_season_label} vs {season_count} seasons ({climatology.first_season}-{climatology.first_season + 1} to {climatology.last_season}-{climatology.last_season + 1})")
+    st.caption(f"🔵 This Season ({this_season_label}) | Dashed: median | Shaded: middle 50% and middle 80% of past seasons")
+
+    days_into_season = season_dates['days_into_season']
+    snowfall = climatology.frames[COL_CUMULATIVE_SNOWFALL]
+
+    st.write("###### Cumulative Snowfall")
+    st.plotly_chart(cached_figure(_climatology_figure, snowfall, this_label=this_season_label, y_title="Total Snowfall (in)", days_into_season=days_into_season))
+
+    # Where this season stands on its latest day with data
+    reported = snowfall[snowfall[COL_CURRENT].notna() & snowfall[COL_MEDIAN].notna()]
+    if not reported.empty:
+        today = reported.iloc[-1]
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("This Season", f"{today[COL_CURRENT]:.1f}\"", delta=f"{today[COL_CURRENT] - today[COL_MEDIAN]:+.1f}\" vs median")
+        with col2:
+            st.metric("Median (same point)", f"{today[COL_MEDIAN]:.1f}\"")
+        with col3:
+            st.metric("Compared to past seasons", _percentile_band(today))
 
-    data = fetch_historical_data_for_current_resort(
-        start_date=date_range[0],
-        end_date=date_range[1],
+    col1a, col2a = st.columns(2)
+    with col1a:
+        st.write("###### Snow Depth")
+        st.plotly_chart(cached_figure(_climatology_figure, climatology.frames[COL_SNOW_DEPTH], this_label=this_season_label, y_title="Snow Depth", days_into_season=days_into_season))
+    with col2a:
+        st.write("###### Mean Temperature")
+        st.plotly_chart(cached_figure(_climatology_figure, climatology.frames[COL_TEMP_MEAN], this_label=this_season_label, y_title="Temperature (°F)", days_into_season=days_into_season))
+
+
+def _percentile_band(row):
+    value = row[COL_CURRENT]
+    if value > row[COL_P90]:
+        return "Above 90th percentile"
+    if value > row[COL_P75]:
+        return "75th-90th percentile"
+    if value >= row[COL_P25]:
+        return "25th-75th percentile"
+    if value >= row[COL_P10]:
+        return "10th-25th percentile"
+    return "Below 10th percentile"
+
+
+def _climatology_figure(frame, this_label, y_title, days_into_season):
+    fig = go.Figure()
+
+    # Bands are drawn as an upper edge followed by a lower edge filled up to it
+    for upper, lower, fillcolor in [
+        (COL_P90, COL_P10, "rgba(31, 119, 180, 0.12)"),
+        (COL_P75, COL_P25, "rgba(31, 119, 180, 0.22)"),
+    ]:
+        for column, fill in [(upper, None), (lower, 'tonexty')]:
+            fig.add_trace(go.Scatter(
+                x=frame[COL_DAY_OF_SEASON],
+                y=frame[column],
+                name=f"{column} (past seasons)",
+                line=dict(width=0),
+                fill=fill,
+                fillcolor=fillcolor,
+                showlegend=False
+            ))
+
+    fig.add_trace(go.Scatter(
+        x=frame[COL_DAY_OF_SEASON],
+        y=frame[COL_MEDIAN],
+        name="Median",
+        line=dict(color="rgba(100, 100, 100, 0.8)", dash='dash')
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=frame[COL_DAY_OF_SEASON],
+        y=frame[COL_CURRENT],
+        name=this_label,
+        line=dict(color=PRIMARY_COLOR, width=2.5)
+    ))
+
+    fig.add_vline(
+        x=days_into_season,
+        line_dash="dot",
+        line_color="rgba(100, 100, 100, 0.5)",
+        annotation_text="Today",
+        annotation_position="top"
     )
 
-    # Fetch comparison data if a comparison resort is selected
-    compare_data = fetch_historical_data_for_comparison_resort(
-        start_date=date_range[0],
-        end_date=date_range[1],
+    fig.update_layout(
+        xaxis_title="Day of Season",
+        yaxis_title=y_title,
+        height=300,
+        margin=dict(t=10, b=40, l=40, r=40),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        hovermode='x unified'
     )
-    compare_resort = st.session_state.get(COMPARE_RESORT_SELECTOR_STATE_KEY, None)
-    compare_state = st.session_state.get(COMPARE_STATE_SELECTOR_STATE_KEY, None)
-    compare_country = st.session_state.get(COMPARE_COUNTRY_SELECTOR_STATE_KEY, None)
+
+    return fig
+
+
+
+def get_normal_resort_data(selected_resort, selected_state, coordinates, compare_selection=None, compare_coordinates=None):
+    date_range = date_range_with_query_params(
+        "Select date range for historical weather data",
+        state_key=DATE_RANGE_STATE_KEY,
+        min_value=ARCHIVE_START_DATE,
+        max_value=date.today())
+
+    # Long ranges are drawn as weekly, monthly or yearly bins, never more than MAX_CHART_POINTS
+    resolution_col, _ = st.columns([1, 3])
+    with resolution_col:
+        selectbox_with_query_params(
+            "Chart resolution",
+            [RESOLUTION_AUTO] + [resolution.name for resolution in available_resolutions(*date_range)],
+            state_key=CHART_RESOLUTION_STATE_KEY,
+        )
+    resolution = choose_resolution(date_range[0], date_range[1], st.session_state[CHART_RESOLUTION_STATE_KEY])
+
+    # Primary and comparison resort (if one is selected) come back from one batched request
+    try:
+        data, compare_data = fetch_historical_data_for_resorts(
+            coordinates, compare_coordinates,
+            start_date=date_range[0],
+            end_date=date_range[1],
+        )
+    except RateLimitedError:
+        st.error("Weather API rate limit reached. Please try again later.")
+        return
+    compare_country, compare_state, compare_resort = compare_selection or (None, None, None)
 
     # Check if comparison is valid
-    has_comparison = (
-        compare_data is not None and
-        compare_country and compare_country != "None" and
-        compare_resort
-    )
+    has_comparison = compare_data is not None and compare_selection is not None
 
     if data is None:
         st.error("Error fetching historical data for the selected resort and date range.")
@@ -132,20 +289,26 @@ def get_normal_resort_data(selected_resort, selected_state):
         st.write(f"### {selected_resort}, {selected_state}")
         st.write(f"##### {format_date(date_range[0])} to {format_date(date_range[1])}")
 
-    # Detect storms for highlighting
+    # Detect storms for highlighting (on daily data, whatever the chart resolution)
     storm_periods = detect_storm_periods(data)
 
-    get_resort_temps(data, compare_data if has_comparison else None, selected_resort, compare_resort)
+    # Binned with each column's own reducer, cumulative snowfall stays daily
+    chart_data = resample_weather(data, resolution)
+    chart_compare_data = resample_weather(compare_data, resolution) if has_comparison else None
+    if resolution != DAILY:
+        st.caption(f"{resolution.name.title()} bins: snowfall and precipitation are totals, max and min temperature and wind are extremes, mean temperature and pressure are averages.")
+
+    get_resort_temps(chart_data, chart_compare_data, selected_resort, compare_resort, resolution)
 
     col1a, col2a = st.columns(2)
     with col1a:
-        get_resort_snowfall(data, storm_periods, compare_data if has_comparison else None, selected_resort, compare_resort)
+        get_resort_snowfall(chart_data, storm_periods, chart_compare_data, selected_resort, compare_resort, resolution)
     with col2a:
-        get_resort_pressure(data, compare_data if has_comparison else None, selected_resort, compare_resort)
+        get_resort_pressure(chart_data, chart_compare_data, selected_resort, compare_resort, resolution)
 
     col1b, col2b = st.columns(2)
     with col1b:
-        get_resort_wind(data, compare_data if has_comparison else None, selected_resort, compare_resort)
+        get_resort_wind(chart_data, chart_compare_data, selected_resort, compare_resort, resolution)
     with col2b:
         get_resort_cumulative_snowfall(data, compare_data if has_comparison else None, selected_resort, compare_resort)
 
@@ -153,57 +316,41 @@ def get_normal_resort_data(selected_resort, selected_state):
     if not has_comparison:
         st.write("### Combined Metrics for Deeper Insights")
         st.write("These combined charts help visualize relationships between different weather parameters. **I highly recommend setting the date range to no more than a few months for optimal clarity.**")
-        get_resort_snowfall_vs_pressure(data)
-        get_custom_comparison(data)
+        get_resort_snowfall_vs_pressure(chart_data, resolution)
+        get_custom_comparison(chart_data)
 
 
-def detect_storm_periods(data, threshold=0.5):
+def detect_storm_periods(data, threshold=0.5, max_gap_days=0, min_days=1):
     if data is None or data.empty:
         return []
-    
+
+    data = data.sort_values(COL_DATE)
     # Mark days as "storm days" if snowfall or precip exceeds threshold
-    data['is_storm'] = (data[COL_SNOWFALL] >= threshold) | (data[COL_PRECIPITATION] >= threshold)
-    
-    storm_periods = []
-    in_storm = False
-    start_date = None
-    total_snow = 0
-    
-    for idx, row in data.iterrows():
-        if row['is_storm'] and not in_storm:
-            # Start of new storm
-            in_storm = True
-            start_date = row[COL_DATE]
-            total_snow = row[COL_SNOWFALL]
-        elif row['is_storm'] and in_storm:
-            # Continuing storm
-            total_snow += row[COL_SNOWFALL]
-        elif not row['is_storm'] and in_storm:
-            # End of storm
-            end_date = data.iloc[idx - 1][COL_DATE]
-            storm_periods.append((start_date, end_date, total_snow))
-            in_storm = False
-            total_snow = 0
-    
-    # Handle case where storm period extends to end of data
-    if in_storm:
-        end_date = data.iloc[-1][COL_DATE]
-        storm_periods.append((start_date, end_date, total_snow))
-    
-    return storm_periods
+    is_storm = (data[COL_SNOWFALL] >= threshold) | (data[COL_PRECIPITATION] >= threshold)
+    starts, ends, totals = find_runs(is_storm, data[COL_SNOWFALL], max_gap=max_gap_days, min_length=min_days)
 
+    dates = data[COL_DATE].to_numpy()
+    return [
+        (pd.Timestamp(start), pd.Timestamp(end), total)
+        for start, end, total in zip(dates[starts], dates[ends], totals.tolist())
+    ]
 
-def get_resort_temps(data, compare_data=None, primary_name="Primary", compare_name="Compare"):
+
+def get_resort_temps(data, compare_data=None, primary_name="Primary", compare_name="Compare", resolution=DAILY):
     if data is None or data.empty:
         st.error("No data available to display temperatures.")
         return
 
-    st.write("###### Daily Temperatures")
+    st.write(f"###### {resolution.name.title()} Temperatures")
 
+    st.plotly_chart(cached_figure(_temps_figure, data, compare_data, primary_name=primary_name, compare_name=compare_name))
+
+
+def _temps_figure(data, compare_data, primary_name, compare_name):
     fig = go.Figure()
 
     # Primary resort data
-    fig.add_trace(go.Scatter(
+    fig.add_trace(line_trace(
         x=data[COL_DATE],
         y=data[COL_TEMP_MAX],
         name=f"Max ({primary_name})" if compare_data is not None else "Max",
@@ -211,7 +358,7 @@ def get_resort_temps(data, compare_data=None, primary_name="Primary", compare_na
         legendgroup="primary"
     ))
 
-    fig.add_trace(go.Scatter(
+    fig.add_trace(line_trace(
         x=data[COL_DATE],
         y=data[COL_TEMP_MEAN],
         name=f"Mean ({primary_name})" if compare_data is not None else "Mean",
@@ -219,7 +366,7 @@ def get_resort_temps(data, compare_data=None, primary_name="Primary", compare_na
         legendgroup="primary"
     ))
 
-    fig.add_trace(go.Scatter(
+    fig.add_trace(line_trace(
         x=data[COL_DATE],
         y=data[COL_TEMP_MIN],
         name=f"Min ({primary_name})" if compare_data is not None else "Min",
@@ -229,7 +376,7 @@ def get_resort_temps(data, compare_data=None, primary_name="Primary", compare_na
 
     # Comparison resort data
     if compare_data is not None and not compare_data.empty:
-        fig.add_trace(go.Scatter(
+        fig.add_trace(line_trace(
             x=compare_data[COL_DATE],
             y=compare_data[COL_TEMP_MAX],
             name=f"Max ({compare_name})",
@@ -237,7 +384,7 @@ def get_resort_temps(data, compare_data=None, primary_name="Primary", compare_na
             legendgroup="compare"
         ))
 
-        fig.add_trace(go.Scatter(
+        fig.add_trace(line_trace(
             x=compare_data[COL_DATE],
             y=compare_data[COL_TEMP_MEAN],
             name=f"Mean ({compare_name})",
@@ -245,7 +392,7 @@ def get_resort_temps(data, compare_data=None, primary_name="Primary", compare_na
             legendgroup="compare"
         ))
 
-        fig.add_trace(go.Scatter(
+        fig.add_trace(line_trace(
             x=compare_data[COL_DATE],
             y=compare_data[COL_TEMP_MIN],
             name=f"Min ({compare_name})",
@@ -268,15 +415,15 @@ def get_resort_temps(data, compare_data=None, primary_name="Primary", compare_na
         hovermode='x unified'
     )
 
-    st.plotly_chart(fig)
+    return fig
 
 
-def get_resort_snowfall(data, storm_periods=None, compare_data=None, primary_name="Primary", compare_name="Compare"):
+def get_resort_snowfall(data, storm_periods=None, compare_data=None, primary_name="Primary", compare_name="Compare", resolution=DAILY):
     if data is None or data.empty:
         st.error("No data available to display snowfall.")
         return
 
-    st.write("###### Daily Snowfall")
+    st.write(f"###### {resolution.name.title()} Snowfall")
 
     # Show storm summary if storms detected
     if storm_periods and len(storm_periods) > 0:
@@ -284,6 +431,10 @@ def get_resort_snowfall(data, storm_periods=None, compare_data=None, primary_nam
         if multi_day_storms:
             st.caption(f"🌨️ {len(multi_day_storms)} multi-day storm(s) detected")
 
+    st.plotly_chart(cached_figure(_snowfall_figure, data, compare_data, storm_periods=tuple(storm_periods or ()) if resolution == DAILY else (), primary_name=primary_name, compare_name=compare_name))
+
+
+def _snowfall_figure(data, compare_data, storm_periods, primary_name, compare_name):
     fig = go.Figure()
 
     # Primary resort data
@@ -305,18 +456,12 @@ def get_resort_snowfall(data, storm_periods=None, compare_data=None, primary_nam
             opacity=0.7
         ))
 
-    # Add storm period shading
-    if storm_periods:
-        for start, end, total in storm_periods:
-            if start != end:  # Only shade multi-day storms
-                fig.add_vrect(
-                    x0=start, x1=end,
-                    fillcolor="rgba(255, 200, 100, 0.2)",
-                    layer="below",
-                    line_width=0,
-                )
-
     fig.update_layout(
+        # Storm period shading, multi-day storms only
+        shapes=period_shapes(
+            [(start, end) for start, end, _ in storm_periods if start != end],
+            fillcolor="rgba(255, 200, 100, 0.2)",
+        ),
         xaxis_title="Date",
         yaxis_title="Snowfall (in)",
         height=250,
@@ -333,20 +478,24 @@ def get_resort_snowfall(data, storm_periods=None, compare_data=None, primary_nam
         hovermode='x unified'
     )
 
-    st.plotly_chart(fig)
+    return fig
 
 
-def get_resort_wind(data, compare_data=None, primary_name="Primary", compare_name="Compare"):
+def get_resort_wind(data, compare_data=None, primary_name="Primary", compare_name="Compare", resolution=DAILY):
     if data is None or data.empty:
         st.error("No data available to display wind data.")
         return
 
-    st.write("###### Daily Wind")
+    st.write(f"###### {resolution.name.title()} Wind")
 
+    st.plotly_chart(cached_figure(_wind_figure, data, compare_data, primary_name=primary_name, compare_name=compare_name))
+
+
+def _wind_figure(data, compare_data, primary_name, compare_name):
     fig = go.Figure()
 
     # Primary resort data
-    fig.add_trace(go.Scatter(
+    fig.add_trace(line_trace(
         x=data[COL_DATE],
         y=data[COL_WIND_GUSTS_MAX],
         name=f"Max Gusts ({primary_name})" if compare_data is not None else "Max Gusts",
@@ -354,7 +503,7 @@ def get_resort_wind(data, compare_data=None, primary_name="Primary", compare_nam
         legendgroup="primary"
     ))
 
-    fig.add_trace(go.Scatter(
+    fig.add_trace(line_trace(
         x=data[COL_DATE],
         y=data[COL_WIND_SPEED_MAX],
         name=f"Max Wind ({primary_name})" if compare_data is not None else "Max Wind Speed",
@@ -364,7 +513,7 @@ def get_resort_wind(data, compare_data=None, primary_name="Primary", compare_nam
 
     # Comparison resort data
     if compare_data is not None and not compare_data.empty:
-        fig.add_trace(go.Scatter(
+        fig.add_trace(line_trace(
             x=compare_data[COL_DATE],
             y=compare_data[COL_WIND_GUSTS_MAX],
             name=f"Max Gusts ({compare_name})",
@@ -372,7 +521,7 @@ def get_resort_wind(data, compare_data=None, primary_name="Primary", compare_nam
             legendgroup="compare"
         ))
 
-        fig.add_trace(go.Scatter(
+        fig.add_trace(line_trace(
             x=compare_data[COL_DATE],
             y=compare_data[COL_WIND_SPEED_MAX],
             name=f"Max Wind ({compare_name})",
@@ -399,7 +548,7 @@ def get_resort_wind(data, compare_data=None, primary_name="Primary", compare_nam
         hovermode='x unified'
     )
 
-    st.plotly_chart(fig)
+    return fig
 
 
 def get_resort_cumulative_snowfall(data, compare_data=None, primary_name="Primary", compare_name="Compare"):
@@ -409,29 +558,35 @@ def get_resort_cumulative_snowfall(data, compare_data=None, primary_name="Primar
 
     st.write("###### Cumulative Snowfall")
 
-    # Calculate cumulative sum for primary
-    cumulative_snow = data[COL_SNOWFALL].cumsum()
-    total_snow = cumulative_snow.iloc[-1]
+    total_snow = data[COL_SNOWFALL].sum()
+    compare_total = None
+    if compare_data is not None and not compare_data.empty:
+        compare_total = compare_data[COL_SNOWFALL].sum()
+
+    st.plotly_chart(cached_figure(_cumulative_snowfall_figure, data, compare_data, primary_name=primary_name, compare_name=compare_name))
+
+    if compare_data is not None and compare_total is not None:
+        st.caption(f"Total: {primary_name}: {total_snow:.1f}\" | {compare_name}: {compare_total:.1f}\"")
+    else:
+        st.caption(f"Total snowfall: {total_snow:.1f} inches")
 
+
+def _cumulative_snowfall_figure(data, compare_data, primary_name, compare_name):
     fig = go.Figure()
 
-    fig.add_trace(go.Scatter(
+    fig.add_trace(line_trace(
         x=data[COL_DATE],
-        y=cumulative_snow,
+        y=data[COL_SNOWFALL].cumsum(),
         name=primary_name if compare_data is not None else "Cumulative Snowfall",
         line=dict(color=PRIMARY_COLOR_ALT),
         fill='tozeroy' if compare_data is None else None
     ))
 
     # Comparison resort data
-    compare_total = None
     if compare_data is not None and not compare_data.empty:
-        compare_cumulative = compare_data[COL_SNOWFALL].cumsum()
-        compare_total = compare_cumulative.iloc[-1]
-
-        fig.add_trace(go.Scatter(
+        fig.add_trace(line_trace(
             x=compare_data[COL_DATE],
-            y=compare_cumulative,
+            y=compare_data[COL_SNOWFALL].cumsum(),
             name=compare_name,
             line=dict(color=COMPARE_COLOR, dash='dash')
         ))
@@ -452,24 +607,23 @@ def get_resort_cumulative_snowfall(data, compare_data=None, primary_name="Primar
         hovermode='x unified'
     )
 
-    st.plotly_chart(fig)
-
-    if compare_data is not None and compare_total is not None:
-        st.caption(f"Total: {primary_name}: {total_snow:.1f}\" | {compare_name}: {compare_total:.1f}\"")
-    else:
-        st.caption(f"Total snowfall: {total_snow:.1f} inches")
+    return fig
 
 
-def get_resort_pressure(data, compare_data=None, primary_name="Primary", compare_name="Compare"):
+def get_resort_pressure(data, compare_data=None, primary_name="Primary", compare_name="Compare", resolution=DAILY):
     if data is None or data.empty:
         st.error("No data available to display pressure.")
         return
 
-    st.write("###### Daily Pressure")
+    st.write(f"###### {resolution.name.title()} Pressure")
+
+    st.plotly_chart(cached_figure(_pressure_figure, data, compare_data, primary_name=primary_name, compare_name=compare_name))
 
+
+def _pressure_figure(data, compare_data, primary_name, compare_name):
     fig = go.Figure()
 
-    fig.add_trace(go.Scatter(
+    fig.add_trace(line_trace(
         x=data[COL_DATE],
         y=data[COL_PRESSURE],
         mode='lines',
@@ -479,7 +633,7 @@ def get_resort_pressure(data, compare_data=None, primary_name="Primary", compare
 
     # Comparison resort data
     if compare_data is not None and not compare_data.empty:
-        fig.add_trace(go.Scatter(
+        fig.add_trace(line_trace(
             x=compare_data[COL_DATE],
             y=compare_data[COL_PRESSURE],
             mode='lines',
@@ -506,59 +660,44 @@ def get_resort_pressure(data, compare_data=None, primary_name="Primary", compare
         hovermode='x unified'
     )
 
-    st.plotly_chart(fig)
+    return fig
+
 
-def get_resort_snowfall_vs_pressure(data):
+def get_resort_snowfall_vs_pressure(data, resolution=DAILY):
     if data is None or data.empty:
         st.error("No data available to display snowfall vs pressure.")
         return
 
-    st.write("###### Daily Snowfall vs Pressure")
-    st.write("This chart shows daily snowfall (bars) against atmospheric pressure (line). Generally, lower pressure is associated with stormy weather and higher snowfall.")
+    st.write(f"###### {resolution.name.title()} Snowfall vs Pressure")
+    # Described at the resolution the chart is actually binned to
+    shown = (
+        "daily snowfall (bars) against atmospheric pressure (line)" if resolution == DAILY
+        else f"{resolution.name} snowfall totals (bars) against atmospheric pressure averaged over each bin (line)"
+    )
+    st.write(f"This chart shows {shown}. Generally, lower pressure is associated with stormy weather and higher snowfall.")
+
+    st.plotly_chart(cached_figure(_snowfall_vs_pressure_figure, data, bin_days=resolution.days))
+
 
+def _snowfall_vs_pressure_figure(data, bin_days):
     fig = go.Figure()
 
     # Calculate average pressure for the period
     avg_pressure = data[COL_PRESSURE].mean()
 
     # Find continuous below-average pressure periods
-    data_sorted = data.sort_values(COL_DATE).reset_index(drop=True)
-    low_pressure_periods = []
-    in_low_period = False
-    period_start = None
-
-    for idx, row in data_sorted.iterrows():
-        is_low = row[COL_PRESSURE] < avg_pressure
-
-        if is_low and not in_low_period:
-            # Start of a new low pressure period
-            in_low_period = True
-            period_start = row[COL_DATE]
-        elif not is_low and in_low_period:
-            # End of low pressure period
-            period_end = data_sorted.iloc[idx - 1][COL_DATE]
-            low_pressure_periods.append((period_start, period_end))
-            in_low_period = False
-            period_start = None
-
-    # Handle case where low pressure extends to end of data
-    if in_low_period:
-        period_end = data_sorted.iloc[-1][COL_DATE]
-        low_pressure_periods.append((period_start, period_end))
-
-    # Add vertical shading for each low pressure period
-    for start_date, end_date in low_pressure_periods:
-        # Add half a day padding on each side for visibility
-        fig.add_vrect(
-            x0=start_date - pd.Timedelta(hours=12),
-            x1=end_date + pd.Timedelta(hours=12),
-            fillcolor="rgba(255, 150, 150, 0.3)",
-            layer="below",
-            line_width=0,
-        )
+    data_sorted = data.sort_values(COL_DATE)
+    starts, ends, _ = find_runs(data_sorted[COL_PRESSURE] < avg_pressure)
+    dates = data_sorted[COL_DATE].to_numpy()
+    low_pressure_periods = zip(map(pd.Timestamp, dates[starts]), map(pd.Timestamp, dates[ends]))
+
+    # Vertical shading for each low pressure period, half a bin padding on each side for visibility
+    fig.update_layout(shapes=period_shapes(
+        low_pressure_periods, fillcolor="rgba(255, 150, 150, 0.3)", padding=pd.Timedelta(days=bin_days) / 2,
+    ))
 
     # Add pressure line on primary y-axis
-    fig.add_trace(go.Scatter(
+    fig.add_trace(line_trace(
         x=data[COL_DATE],
         y=data[COL_PRESSURE],
         mode='lines',
@@ -610,11 +749,13 @@ def get_resort_snowfall_vs_pressure(data):
             x=1
         )
     )
-    
-    st.plotly_chart(fig)
+
+    return fig
 
 
+@st.fragment
 def get_custom_comparison(data):
+    # Its metric pickers only redraw this chart, data is the frame the chart grid passed in
     if data is None or data.empty:
         st.error("No data available for custom comparison.")
         return
@@ -633,9 +774,6 @@ def get_custom_comparison(data):
         COL_WIND_GUSTS_MAX
     ]
     
-    # Bar chart metrics (rest will be lines)
-    bar_metrics = [COL_SNOWFALL, COL_PRECIPITATION]
-    
     col1, col2 = st.columns(2)
     with col1:
         metric1 = st.selectbox(
@@ -650,10 +788,14 @@ def get_custom_comparison(data):
             index=metrics.index(COL_SNOWFALL)
         )
     
+    st.plotly_chart(cached_figure(_custom_comparison_figure, data, metric1=metric1, metric2=metric2))
+
+
+def _custom_comparison_figure(data, metric1, metric2):
     fig = go.Figure()
     
     # Add first metric
-    if metric1 in bar_metrics:
+    if metric1 in BAR_METRICS:
         fig.add_trace(go.Bar(
             x=data[COL_DATE],
             y=data[metric1],
@@ -662,7 +804,7 @@ def get_custom_comparison(data):
             yaxis='y'
         ))
     else:
-        fig.add_trace(go.Scatter(
+        fig.add_trace(line_trace(
             x=data[COL_DATE],
             y=data[metric1],
             mode='lines',
@@ -672,7 +814,7 @@ def get_custom_comparison(data):
         ))
     
     # Add second metric
-    if metric2 in bar_metrics:
+    if metric2 in BAR_METRICS:
         fig.add_trace(go.Bar(
             x=data[COL_DATE],
             y=data[metric2],
@@ -681,7 +823,7 @@ def get_custom_comparison(data):
             yaxis='y2'
         ))
     else:
-        fig.add_trace(go.Scatter(
+        fig.add_trace(line_trace(
             x=data[COL_DATE],
             y=data[metric2],
             mode='lines',
@@ -714,7 +856,7 @@ def get_custom_comparison(data):
         )
     )
 
-    st.plotly_chart(fig)
+    return fig
 
 
 # ============================================
@@ -725,6 +867,10 @@ def get_season_temps(this_season_data, last_season_data, this_label, last_label)
     
     st.write("###### Daily Temperatures")
 
+    st.plotly_chart(cached_figure(_season_temps_figure, this_season_data, last_season_data, this_label=this_label, last_label=last_label))
+
+
+def _season_temps_figure(this_season_data, last_season_data, this_label, last_label):
     fig = go.Figure()
 
     # This season (solid lines)
@@ -760,13 +906,17 @@ def get_season_temps(this_season_data, last_season_data, this_label, last_label)
         hovermode='x unified'
     )
 
-    st.plotly_chart(fig)
+    return fig
 
 
 def get_season_snowfall(this_season_data, last_season_data, this_label, last_label):
     
     st.write("###### Daily Snowfall")
 
+    st.plotly_chart(cached_figure(_season_snowfall_figure, this_season_data, last_season_data, this_label=this_label, last_label=last_label))
+
+
+def _season_snowfall_figure(this_season_data, last_season_data, this_label, last_label):
     fig = go.Figure()
 
     fig.add_trace(go.Bar(
@@ -801,13 +951,17 @@ def get_season_snowfall(this_season_data, last_season_data, this_label, last_lab
         hovermode='x unified'
     )
 
-    st.plotly_chart(fig)
+    return fig
 
 
 def get_season_pressure(this_season_data, last_season_data, this_label, last_label):
     
     st.write("###### Daily Pressure")
 
+    st.plotly_chart(cached_figure(_season_pressure_figure, this_season_data, last_season_data, this_label=this_label, last_label=last_label))
+
+
+def _season_pressure_figure(this_season_data, last_season_data, this_label, last_label):
     fig = go.Figure()
 
     fig.add_trace(go.Scatter(
@@ -842,13 +996,17 @@ def get_season_pressure(this_season_data, last_season_data, this_label, last_lab
         hovermode='x unified'
     )
 
-    st.plotly_chart(fig)
+    return fig
 
 
 def get_season_wind(this_season_data, last_season_data, this_label, last_label):
     
     st.write("###### Daily Wind")
 
+    st.plotly_chart(cached_figure(_season_wind_figure, this_season_data, last_season_data, this_label=this_label, last_label=last_label))
+
+
+def _season_wind_figure(this_season_data, last_season_data, this_label, last_label):
     fig = go.Figure()
 
     fig.add_trace(go.Scatter(
@@ -885,7 +1043,7 @@ def get_season_wind(this_season_data, last_season_data, this_label, last_label):
         hovermode='x unified'
     )
 
-    st.plotly_chart(fig)
+    return fig
 
 
 def get_season_cumulative_snowfall(this_season_data, last_season_data, this_label, last_label, season_dates):
@@ -903,12 +1061,38 @@ def get_season_cumulative_snowfall(this_season_data, last_season_data, this_labe
     days_into_season = season_dates['days_into_season']
     last_at_equivalent = last_cumulative.iloc[days_into_season] if len(last_cumulative) > days_into_season else last_total
 
+    st.plotly_chart(cached_figure(_season_cumulative_snowfall_figure, this_season_data, last_season_data, this_label=this_label, last_label=last_label, days_into_season=days_into_season))
+
+    # Show comparison with metrics
+    diff = this_total - last_at_equivalent
+    diff_str = f"+{diff:.1f}" if diff >= 0 else f"{diff:.1f}"
+
+    # Calculate percentage difference
+    if last_at_equivalent > 0:
+        pct_diff = ((this_total - last_at_equivalent) / last_at_equivalent) * 100
+        pct_str = f"+{pct_diff:.0f}%" if pct_diff >= 0 else f"{pct_diff:.0f}%"
+    else:
+        pct_diff = 0
+        pct_str = "N/A"
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("This Season", f"{this_total:.1f}\"", delta=f"{diff_str}\" vs last year")
+    with col2:
+        st.metric("Last Season (same point)", f"{last_at_equivalent:.1f}\"")
+    with col3:
+        st.metric("Year-over-Year", pct_str)
+
+    st.caption(f"Last season final total: {last_total:.1f}\"")
+
+
+def _season_cumulative_snowfall_figure(this_season_data, last_season_data, this_label, last_label, days_into_season):
     fig = go.Figure()
 
     # This season
     fig.add_trace(go.Scatter(
         x=this_season_data[COL_DAY_OF_SEASON],
-        y=this_cumulative,
+        y=this_season_data[COL_SNOWFALL].cumsum(),
         name=this_label,
         line=dict(color=PRIMARY_COLOR_ALT)
     ))
@@ -916,7 +1100,7 @@ def get_season_cumulative_snowfall(this_season_data, last_season_data, this_labe
     # Last season (full season)
     fig.add_trace(go.Scatter(
         x=last_season_data[COL_DAY_OF_SEASON],
-        y=last_cumulative,
+        y=last_season_data[COL_SNOWFALL].cumsum(),
         name=last_label,
         line=dict(color=COMPARE_COLOR, dash='dash')
     ))
@@ -945,26 +1129,4 @@ def get_season_cumulative_snowfall(this_season_data, last_season_data, this_labe
         hovermode='x unified'
     )
 
-    st.plotly_chart(fig)
-
-    # Show comparison with metrics
-    diff = this_total - last_at_equivalent
-    diff_str = f"+{diff:.1f}" if diff >= 0 else f"{diff:.1f}"
-
-    # Calculate percentage difference
-    if last_at_equivalent > 0:
-        pct_diff = ((this_total - last_at_equivalent) / last_at_equivalent) * 100
-        pct_str = f"+{pct_diff:.0f}%" if pct_diff >= 0 else f"{pct_diff:.0f}%"
-    else:
-        pct_diff = 0
-        pct_str = "N/A"
-
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("This Season", f"{this_total:.1f}\"", delta=f"{diff_str}\" vs last year")
-    with col2:
-        st.metric("Last Season (same point)", f"{last_at_equivalent:.1f}\"")
-    with col3:
-        st.metric("Year-over-Year", pct_str)
-
-    st.caption(f"Last season final total: {last_total:.1f}\"")
\ No newline at end of file
+    return fig
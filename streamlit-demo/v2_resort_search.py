@@ -0,0 +1,45 @@
+import streamlit as st
+from search_index import get_resort_search_index
+from v2_constants import (
+    COUNTRY_SELECTOR_STATE_KEY, STATE_SELECTOR_STATE_KEY, RESORT_SELECTOR_STATE_KEY, RESORT_SEARCH_STATE_KEY
+)
+
+RESORT_SEARCH_RESULT_COUNT = 6
+
+
+def jump_to_resort(entry):
+    # The selectors pick their value up from the query params on the next run
+    st.query_params.update({
+        COUNTRY_SELECTOR_STATE_KEY: entry.country.lower(),
+        STATE_SELECTOR_STATE_KEY: entry.region.lower(),
+        RESORT_SELECTOR_STATE_KEY: entry.name.lower(),
+    })
+    for state_key in (COUNTRY_SELECTOR_STATE_KEY, STATE_SELECTOR_STATE_KEY, RESORT_SELECTOR_STATE_KEY):
+        if state_key in st.session_state:
+            del st.session_state[state_key]
+    st.session_state[RESORT_SEARCH_STATE_KEY] = ""
+
+
+def get_resort_search():
+    query = st.text_input(
+        "Search resorts", key=RESORT_SEARCH_STATE_KEY, placeholder="Search any resort, e.g. Whistler or Val-d'Irène",
+    )
+    if not query:
+        return
+
+    results = get_resort_search_index().search(
+        query, k=RESORT_SEARCH_RESULT_COUNT, predicate=lambda entry: entry.catalog_row is not None,
+    )
+    if not results:
+        st.caption("No matching resorts.")
+        return
+
+    for i, result in enumerate(results):
+        entry = result.entry
+        st.button(
+            f"{entry.name} · {entry.region}, {entry.country}",
+            key=f"{RESORT_SEARCH_STATE_KEY}_{i}",
+            on_click=jump_to_resort,
+            args=(entry,),
+            type="tertiary",
+        )
@@ -1,17 +1,16 @@
 import streamlit as st
-from v2_api import fetch_organized_resorts
-from v2_components import selectbox_with_query_params
+from v2_api import fetch_resort_hierarchy
+from v2_components import rerun_app_when_changed, selectbox_with_query_params
 from v2_constants import (
     COUNTRY_SELECTOR_STATE_KEY, STATE_SELECTOR_STATE_KEY, RESORT_SELECTOR_STATE_KEY,
     COMPARE_COUNTRY_SELECTOR_STATE_KEY, COMPARE_STATE_SELECTOR_STATE_KEY, COMPARE_RESORT_SELECTOR_STATE_KEY,
-    COMPARE_SEASONS_STATE_KEY
+    COMPARE_SEASONS_STATE_KEY, SELECTION_OUTPUT_STATE_KEY, COMPARISON_OUTPUT_STATE_KEY
 )
 
 
 
 def get_country_selector():
-    organized_resorts = fetch_organized_resorts()
-    countries = sorted(organized_resorts.keys())
+    countries = fetch_resort_hierarchy().countries
 
     selectbox_with_query_params(
         "Select a country",
@@ -21,15 +20,13 @@ def get_country_selector():
 
 
 def get_state_selector():
-    organized_resorts = fetch_organized_resorts()
     selected_country = st.session_state.get(COUNTRY_SELECTOR_STATE_KEY, None)
+    states = fetch_resort_hierarchy().regions(selected_country)
 
-    if not selected_country or selected_country not in organized_resorts:
+    if not selected_country or not states:
         # Nothing when country not selected
         return
 
-    states = sorted(organized_resorts[selected_country].keys())
-
     selectbox_with_query_params(
         "Select a state",
         options=states,
@@ -38,20 +35,19 @@ def get_state_selector():
 
 
 def get_resort_selector():
-    organized_resorts = fetch_organized_resorts()
+    hierarchy = fetch_resort_hierarchy()
     selected_country = st.session_state.get(COUNTRY_SELECTOR_STATE_KEY, None)
 
-    if not selected_country or selected_country not in organized_resorts:
+    if not selected_country or not hierarchy.regions(selected_country):
         # Nothing when country not selected
         return
     
     selected_state = st.session_state.get(STATE_SELECTOR_STATE_KEY, None)
-    if not selected_state or selected_state not in organized_resorts[selected_country]:
+    if not selected_state or selected_state not in hierarchy.regions(selected_country):
         # Nothing when state not selected
         return
     
-    resorts = organized_resorts[selected_country][selected_state]
-    resort_names = sorted([resort["name"] for resort in resorts if "name" in resort and resort["name"] != ""])
+    resort_names = hierarchy.resort_names(selected_country, selected_state)
 
     selectbox_with_query_params(
         "Select a resort",
@@ -60,7 +56,30 @@ def get_resort_selector():
     )
 
   
+def get_selected_resort():
+    return (
+        st.session_state.get(COUNTRY_SELECTOR_STATE_KEY, None),
+        st.session_state.get(STATE_SELECTOR_STATE_KEY, None),
+        st.session_state.get(RESORT_SELECTOR_STATE_KEY, None),
+    )
+
+
+def get_selected_comparison():
+    # (compare seasons, comparison resort or None while it is still being picked)
+    compare_country = st.session_state.get(COMPARE_COUNTRY_SELECTOR_STATE_KEY, None)
+    compare_resort = st.session_state.get(COMPARE_RESORT_SELECTOR_STATE_KEY, None)
+    if not compare_country or compare_country == "None" or not compare_resort:
+        return st.session_state.get(COMPARE_SEASONS_STATE_KEY, False), None
+    return (
+        st.session_state.get(COMPARE_SEASONS_STATE_KEY, False),
+        (compare_country, st.session_state.get(COMPARE_STATE_SELECTOR_STATE_KEY, None), compare_resort),
+    )
+
+
+@st.fragment
 def get_location_selector():
+    # Any change to the (country, state, resort) tuple, a new country or state included,
+    # reruns the whole page once this bar has run
     col1, col2, col3 = st.columns([1,1,2], vertical_alignment="bottom")
     with col1:
         get_country_selector()
@@ -68,11 +87,11 @@ def get_location_selector():
         get_state_selector()
     with col3:
         get_resort_selector()
+    rerun_app_when_changed(SELECTION_OUTPUT_STATE_KEY, get_selected_resort())
 
 
 def get_compare_country_selector():
-    organized_resorts = fetch_organized_resorts()
-    countries = ["None"] + sorted(organized_resorts.keys())
+    countries = ("None",) + fetch_resort_hierarchy().countries
 
     selectbox_with_query_params(
         "Compare with country",
@@ -82,14 +101,12 @@ def get_compare_country_selector():
 
 
 def get_compare_state_selector():
-    organized_resorts = fetch_organized_resorts()
     selected_country = st.session_state.get(COMPARE_COUNTRY_SELECTOR_STATE_KEY, None)
+    states = fetch_resort_hierarchy().regions(selected_country)
 
-    if not selected_country or selected_country == "None" or selected_country not in organized_resorts:
+    if not selected_country or selected_country == "None" or not states:
         return
 
-    states = sorted(organized_resorts[selected_country].keys())
-
     selectbox_with_query_params(
         "Compare with state",
         options=states,
@@ -98,18 +115,17 @@ def get_compare_state_selector():
 
 
 def get_compare_resort_selector():
-    organized_resorts = fetch_organized_resorts()
+    hierarchy = fetch_resort_hierarchy()
     selected_country = st.session_state.get(COMPARE_COUNTRY_SELECTOR_STATE_KEY, None)
 
-    if not selected_country or selected_country == "None" or selected_country not in organized_resorts:
+    if not selected_country or selected_country == "None" or not hierarchy.regions(selected_country):
         return
 
     selected_state = st.session_state.get(COMPARE_STATE_SELECTOR_STATE_KEY, None)
-    if not selected_state or selected_state not in organized_resorts[selected_country]:
+    if not selected_state or selected_state not in hierarchy.regions(selected_country):
         return
 
-    resorts = organized_resorts[selected_country][selected_state]
-    resort_names = sorted([resort["name"] for resort in resorts if "name" in resort and resort["name"] != ""])
+    resort_names = hierarchy.resort_names(selected_country, selected_state)
 
     selectbox_with_query_params(
         "Compare with resort",
@@ -160,7 +176,9 @@ def _is_comparing_resorts():
     return bool(compare_country and compare_country != "None" and compare_resort)
 
 
+@st.fragment
 def get_comparison_selector():
+    # Partial comparison picks stay inside the panel, a complete one redraws the charts
     
     query_params = st.query_params
 
@@ -233,4 +251,6 @@ def get_comparison_selector():
                 get_compare_resort_selector()
 
             if has_resort_comparison_started:
-                st.button("Clear resort comparison", type="secondary", on_click=clear_comparison_callback)
\ No newline at end of file
+                st.button("Clear resort comparison", type="secondary", on_click=clear_comparison_callback)
+
+    rerun_app_when_changed(COMPARISON_OUTPUT_STATE_KEY, get_selected_comparison())
\ No newline at end of file
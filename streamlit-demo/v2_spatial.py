@@ -0,0 +1,116 @@
+import numpy as np
+import streamlit as st
+from v2_catalog import get_resort_catalog
+
+EARTH_RADIUS_MILES = 3958.8
+GRID_CELL_DEGREES = 1.0
+# First radius tried by nearest(), doubled until enough resorts are inside it
+NEAREST_START_RADIUS_MILES = 25.0
+
+
+class ResortSpatialIndex:
+    # Fixed lat/lng grid stored CSR style: rows sorted by cell, cell_starts[c]:cell_starts[c + 1]
+    # is cell c. Cells in one latitude band are contiguous, so a query reads one slice per band.
+    def __init__(self, lat, lng, rows, cell_degrees=GRID_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.lat_cells = int(np.ceil(180 / cell_degrees))
+        self.lng_cells = int(np.ceil(360 / cell_degrees))
+
+        cells = self._lat_cell(lat) * self.lng_cells + self._lng_cell(lng)
+        order = np.argsort(cells, kind="stable")
+        self.rows = rows[order]
+        self.lat = np.radians(lat[order])
+        self.lng = np.radians(lng[order])
+        self.cos_lat = np.cos(self.lat)
+        self.cell_starts = np.searchsorted(cells[order], np.arange(self.lat_cells * self.lng_cells + 1))
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        # Unnamed ski areas cannot be selected anywhere, so they are left out
+        named = np.array([name != "" for name in map(catalog.name, range(len(catalog)))], dtype=bool)
+        valid = named & ~np.isnan(catalog.lat) & ~np.isnan(catalog.lng)
+        rows = np.flatnonzero(valid)
+        return cls(np.asarray(catalog.lat)[rows], np.asarray(catalog.lng)[rows], rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _lat_cell(self, lat):
+        return np.clip(np.floor((np.asarray(lat) + 90) / self.cell_degrees).astype(np.int64), 0, self.lat_cells - 1)
+
+    def _lng_cell(self, lng):
+        return np.floor((np.asarray(lng) + 180) / self.cell_degrees).astype(np.int64) % self.lng_cells
+
+    def _candidate_positions(self, lat, lng, radius_miles):
+        angular = radius_miles / EARTH_RADIUS_MILES
+        lat_span = np.degrees(angular)
+        first_band = int(self._lat_cell(lat - lat_span))
+        last_band = int(self._lat_cell(lat + lat_span))
+
+        # Widest longitude offset reachable within the radius, or every column near a pole
+        sin_angular = np.sin(angular)
+        cos_lat = np.cos(np.radians(lat))
+        if angular >= np.pi / 2 or lat + lat_span >= 90 or lat - lat_span <= -90 or sin_angular >= cos_lat:
+            column_ranges = [(0, self.lng_cells - 1)]
+        else:
+            lng_span = np.degrees(np.arcsin(sin_angular / cos_lat))
+            first_column = int(np.floor((lng - lng_span + 180) / self.cell_degrees))
+            last_column = int(np.floor((lng + lng_span + 180) / self.cell_degrees))
+            if last_column - first_column + 1 >= self.lng_cells:
+                column_ranges = [(0, self.lng_cells - 1)]
+            elif first_column < 0:
+                column_ranges = [(first_column % self.lng_cells, self.lng_cells - 1), (0, last_column)]
+            elif last_column >= self.lng_cells:
+                column_ranges = [(first_column, self.lng_cells - 1), (0, last_column % self.lng_cells)]
+            else:
+                column_ranges = [(first_column, last_column)]
+
+        band_offsets = np.arange(first_band, last_band + 1) * self.lng_cells
+        slices = [
+            (self.cell_starts[band + first], self.cell_starts[band + last + 1])
+            for band in band_offsets
+            for first, last in column_ranges
+        ]
+        return np.concatenate([np.arange(start, end) for start, end in slices]) if slices else np.empty(0, dtype=np.int64)
+
+    def _distances(self, positions, lat, lng):
+        lat = np.radians(lat)
+        lng = np.radians(lng)
+        half_dlat = np.sin((self.lat[positions] - lat) / 2)
+        half_dlng = np.sin((self.lng[positions] - lng) / 2)
+        a = half_dlat ** 2 + np.cos(lat) * self.cos_lat[positions] * half_dlng ** 2
+        return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def within(self, lat, lng, radius_miles):
+        # Catalog rows and great-circle distances (miles) inside the radius, nearest first
+        positions = self._candidate_positions(lat, lng, radius_miles)
+        distances = self._distances(positions, lat, lng)
+        inside = distances <= radius_miles
+        positions = positions[inside]
+        distances = distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return self.rows[positions[order]], distances[order]
+
+    def nearest(self, lat, lng, k, exclude_row=None):
+        wanted = k + (1 if exclude_row is not None else 0)
+        radius = NEAREST_START_RADIUS_MILES
+        while True:
+            # Everything inside the radius is returned, so once it holds k resorts they are the k nearest
+            rows, distances = self.within(lat, lng, radius)
+            if len(rows) >= wanted or radius >= np.pi * EARTH_RADIUS_MILES:
+                break
+            radius *= 2
+        if exclude_row is not None:
+            keep = rows != exclude_row
+            rows = rows[keep]
+            distances = distances[keep]
+        return rows[:k], distances[:k]
+
+
+@st.cache_resource
+def _build_resort_spatial_index(catalog_version):
+    return ResortSpatialIndex.from_catalog(get_resort_catalog())
+
+
+def get_resort_spatial_index():
+    return _build_resort_spatial_index(get_resort_catalog().version)
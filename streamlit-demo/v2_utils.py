@@ -1,5 +1,36 @@
 from datetime import datetime
 
+import numpy as np
+
 def format_date(date_str):
     date_obj = datetime.strptime(str(date_str), "%Y-%m-%d")
-    return date_obj.strftime("%b %d, %Y")
\ No newline at end of file
+    return date_obj.strftime("%b %d, %Y")
+
+
+def find_runs(mask, values=None, max_gap=0, min_length=1):
+    # Runs of True in mask as (starts, ends, totals): inclusive positional bounds and the sum of
+    # values over each run. Runs separated by at most max_gap False entries are merged, and runs
+    # spanning fewer than min_length entries are dropped.
+    mask = np.asarray(mask, dtype=bool)
+    edges = np.diff(mask.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+
+    if max_gap > 0 and len(starts) > 1:
+        # A run joins the previous one when the False stretch between them is short enough
+        opens_run = np.concatenate(([True], starts[1:] - ends[:-1] - 1 > max_gap))
+        ends = ends[np.append(np.flatnonzero(opens_run)[1:] - 1, len(ends) - 1)]
+        starts = starts[opens_run]
+
+    keep = ends - starts + 1 >= min_length
+    starts = starts[keep]
+    ends = ends[keep]
+
+    if values is None or not len(starts):
+        totals = np.zeros(len(starts))
+    else:
+        values = np.append(np.nan_to_num(np.asarray(values, dtype=float)), 0.0)
+        # Segmented sum: reduceat over [start, end + 1) pairs, entries in bridged gaps included
+        bounds = np.column_stack((starts, ends + 1)).ravel()
+        totals = np.add.reduceat(values, bounds)[::2]
+    return starts, ends, totals
@@ -0,0 +1,118 @@
+import os
+import time
+from contextlib import closing
+from datetime import timedelta
+
+import pandas as pd
+from db import connect
+from v2_constants import (
+    COL_DATE, COL_TEMP_MAX, COL_TEMP_MIN, COL_TEMP_MEAN, COL_PRECIPITATION, COL_SNOWFALL,
+    COL_SNOW_DEPTH, COL_WIND_SPEED_MAX, COL_WIND_GUSTS_MAX, COL_PRESSURE
+)
+
+WEATHER_DB = "weather.db"
+
+# Open-Meteo daily variable for each dataframe column
+DAILY_VARIABLES = {
+    COL_TEMP_MAX: "temperature_2m_max",
+    COL_TEMP_MIN: "temperature_2m_min",
+    COL_TEMP_MEAN: "temperature_2m_mean",
+    COL_PRECIPITATION: "precipitation_sum",
+    COL_SNOWFALL: "snowfall_sum",
+    COL_SNOW_DEPTH: "snow_depth_max",
+    COL_WIND_SPEED_MAX: "wind_speed_10m_max",
+    COL_WIND_GUSTS_MAX: "wind_gusts_10m_max",
+    COL_PRESSURE: "pressure_msl_mean",
+}
+
+# 4 decimal places is ~11 m, well inside one archive grid cell
+LOCATION_PRECISION = 4
+
+# Archive days fetched at least this many days after the fact are final and kept forever.
+# Anything fetched earlier is still being backfilled upstream and is revalidated after the TTL.
+WEATHER_SETTLE_DAYS = int(os.getenv("WEATHER_SETTLE_DAYS", "5"))
+WEATHER_RECENT_TTL_SECONDS = int(os.getenv("WEATHER_RECENT_TTL_SECONDS", "3600"))
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS daily_weather (
+    location TEXT NOT NULL,
+    date TEXT NOT NULL,
+    {", ".join(f"{variable} REAL" for variable in DAILY_VARIABLES.values())},
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (location, date)
+) WITHOUT ROWID;
+"""
+
+
+def _connect():
+    return closing(connect(WEATHER_DB, SCHEMA))
+
+
+def location_key(lat, lng):
+    return f"{float(lat):.{LOCATION_PRECISION}f},{float(lng):.{LOCATION_PRECISION}f}"
+
+
+def _to_date(value):
+    return pd.Timestamp(value).date()
+
+
+def missing_date_ranges(lat, lng, start_date, end_date):
+    start_date = _to_date(start_date)
+    end_date = _to_date(end_date)
+
+    with _connect() as connection:
+        stored = {
+            row[0] for row in connection.execute(
+                "SELECT date FROM daily_weather WHERE location = ? AND date BETWEEN ? AND ? "
+                "AND (julianday(fetched_at, 'unixepoch') - julianday(date) >= ? OR fetched_at >= ?)",
+                (
+                    location_key(lat, lng), start_date.isoformat(), end_date.isoformat(),
+                    WEATHER_SETTLE_DAYS, time.time() - WEATHER_RECENT_TTL_SECONDS,
+                ),
+            )
+        }
+
+    ranges = []
+    gap_start = None
+    day = start_date
+    while day <= end_date:
+        if day.isoformat() in stored:
+            if gap_start is not None:
+                ranges.append((gap_start, day - timedelta(days=1)))
+                gap_start = None
+        elif gap_start is None:
+            gap_start = day
+        day += timedelta(days=1)
+    if gap_start is not None:
+        ranges.append((gap_start, end_date))
+    return ranges
+
+
+def store_daily_weather(lat, lng, daily):
+    location = location_key(lat, lng)
+    fetched_at = time.time()
+    variables = list(DAILY_VARIABLES.values())
+    rows = [
+        (location, day, *(daily[variable][i] for variable in variables), fetched_at)
+        for i, day in enumerate(daily["time"])
+    ]
+    with _connect() as connection, connection:
+        connection.executemany(
+            f"INSERT OR REPLACE INTO daily_weather (location, date, {', '.join(variables)}, fetched_at) "
+            f"VALUES (?, ?, {', '.join('?' for _ in variables)}, ?)",
+            rows,
+        )
+
+
+def load_daily_weather(lat, lng, start_date, end_date):
+    with _connect() as connection:
+        rows = connection.execute(
+            f"SELECT date, {', '.join(DAILY_VARIABLES.values())} FROM daily_weather "
+            "WHERE location = ? AND date BETWEEN ? AND ? ORDER BY date",
+            (location_key(lat, lng), _to_date(start_date).isoformat(), _to_date(end_date).isoformat()),
+        ).fetchall()
+
+    df = pd.DataFrame(rows, columns=[COL_DATE, *DAILY_VARIABLES.keys()])
+    df[COL_DATE] = pd.to_datetime(df[COL_DATE])
+    df[list(DAILY_VARIABLES.keys())] = df[list(DAILY_VARIABLES.keys())].astype(float)
+    return df